@@ -1,69 +1,246 @@
-from sentence_transformers import SentenceTransformer
-from app.core.database import get_collection
+from app.core.database import CHROMA_STORE_DOCUMENTS, get_collection, collection_space, similarity_to_distance
+from app.core.model_registry import get_embedding_model
+from app.core.hot_tier import get_hot_tier
+from app.core.metrics import DUPLICATES
 from app.models.article import Article
+from app.core.simhash_index import SimHashIndex
+from typing import List, Optional, Tuple
+import numpy as np
+import os
 import uuid
 
-# Load model once (global for now, better in a singleton or dependency injection)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+LEXICAL_DEDUP_ENABLED = os.getenv("LEXICAL_DEDUP", "1") == "1"
+# Cosine similarity threshold (matches L2 < 0.3 on unit vectors)
+DUPLICATE_THRESHOLD = 0.85
+
+def chroma_metadata(article: Article) -> dict:
+    """Filter metadata stored with each vector. published_at is epoch seconds so it can be range-filtered."""
+    return {
+        "title": article.title,
+        "source": article.source,
+        "sector": article.sector,
+        "published_at": int(article.published_at.timestamp())
+    }
 
 class DeduplicationAgent:
     def __init__(self):
-        self.collection = get_collection()
-        # self.collection = get_collection() # Moved to process method
-        self.model = SentenceTransformer('all-MiniLM-L6-v2') # Model initialized here
-        self.threshold = 0.85 # Similarity threshold
+        get_collection()
+        self.threshold = DUPLICATE_THRESHOLD
+        # Cheap near-verbatim check that runs before the embedding model
+        self.lexical_index = SimHashIndex() if LEXICAL_DEDUP_ENABLED else None
+
+    @property
+    def collection(self):
+        # Resolved on each use so a re-index switch is picked up without a restart
+        return get_collection()
+
+    @property
+    def model(self):
+        # Shared across agents, loaded on first use
+        return get_embedding_model()
+
+    def hot_tier(self, dim: int):
+        # Recent vectors in memory; None when HOT_TIER=0. The dimension comes from
+        # the vectors at hand, so callers that pass vectors never load the model.
+        return get_hot_tier(dim)
 
     def process(self, article: Article) -> Article:
         """
         Checks if the article is a duplicate.
-        If unique, adds to vector DB.
         If duplicate, marks it and links to original.
         """
-        from app.core.database import get_collection # Import moved here
-        collection = get_collection() # Collection initialized here
-        
-        # Generate embedding
-        text_to_embed = f"{article.title} {article.content}"
-        embedding = self.model.encode(text_to_embed).tolist() # Use self.model
-        
-        # Query ChromaDB
-        results = collection.query( # Use local collection
-            query_embeddings=[embedding],
-            n_results=1,
+        self.process_batch([article])
+        return article
+
+    def process_batch(self, articles: List[Article], vectors: Optional[np.ndarray] = None) -> List[Optional[List[float]]]:
+        """
+        Batched variant of `process` for a whole fetch cycle.
+        Near-verbatim copies are caught by the SimHash prefilter without
+        touching the model. The rest are encoded in one `encode_batch` call,
+        clustered against each other, and only each cluster's canonical
+        article is checked against stored articles (`find_stored_matches`).
+        Returns the embeddings (None for lexical duplicates) so the storage
+        stage can reuse them instead of encoding again. Pass `vectors` (one
+        row per article) when they were already computed, e.g. by an
+        ingestion worker process.
+        """
+        if not articles:
+            return []
+
+        texts = [f"{article.title} {article.content}" for article in articles]
+        embeddings: List[Optional[List[float]]] = [None] * len(articles)
+
+        # 1. Lexical prefilter
+        pending = []
+        for i, article in enumerate(articles):
+            article.is_duplicate = False
+            article.duplicate_of_id = None
+            match_id = None
+            if self.lexical_index is not None:
+                match_id, _ = self.lexical_index.find_duplicate(texts[i])
+            if match_id and match_id != article.id:
+                article.is_duplicate = True
+                article.duplicate_of_id = match_id
+                DUPLICATES.inc(method="lexical")
+                print(f"Duplicate found (lexical)! {article.title} is near-identical to {match_id}")
+            else:
+                pending.append(i)
+
+        if not pending:
+            return embeddings
+
+        # 2. Embed the rest as one matrix
+        if vectors is not None:
+            vectors = np.asarray(vectors, dtype=np.float32)[pending]
+        else:
+            vectors = self.model.encode_batch([texts[i] for i in pending])
+        for row, i in enumerate(pending):
+            embeddings[i] = vectors[row].tolist()
+
+        # 3. Cluster copies of the same story within this batch
+        canonical_rows = self.cluster_batch([articles[i] for i in pending], vectors)
+        for row, canonical_row in enumerate(canonical_rows):
+            if canonical_row != row:
+                article = articles[pending[row]]
+                article.is_duplicate = True
+                article.duplicate_of_id = articles[pending[canonical_row]].id
+                DUPLICATES.inc(method="batch")
+                print(f"Duplicate found (batch)! {article.title} is similar to {article.duplicate_of_id}")
+
+        # 4. Semantic check of the canonical articles against stored articles
+        canonical = sorted(set(canonical_rows))
+        matches = self.find_stored_matches(
+            [articles[pending[row]].id for row in canonical],
+            vectors[canonical]
+        )
+
+        for row, match in zip(canonical, matches):
+            if match is None:
+                continue
+            article = articles[pending[row]]
+            match_id, detail = match
+            article.is_duplicate = True
+            article.duplicate_of_id = match_id
+            DUPLICATES.inc(method="semantic")
+            print(f"Duplicate found! {article.title} is similar to {match_id} ({detail})")
+            # The rest of its cluster points at the stored original
+            for other_row, canonical_row in enumerate(canonical_rows):
+                if canonical_row == row and other_row != row:
+                    articles[pending[other_row]].duplicate_of_id = match_id
+
+        return embeddings
+
+    def find_stored_matches(self, article_ids: List[str], vectors: np.ndarray) -> List[Optional[Tuple[str, str]]]:
+        """
+        Nearest stored article for each vector, if it is within the duplicate
+        threshold: (match_id, detail) or None. Uses only the hot tier when it
+        is enabled (exact in-memory search over recent articles, including
+        those stored by other processes), otherwise one multi-embedding
+        Chroma query.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        hot_tier = self.hot_tier(vectors.shape[1])
+        if hot_tier is not None:
+            matches = []
+            # k=2 so an article re-checked against its own stored copy still finds another
+            for article_id, neighbours in zip(article_ids, hot_tier.search(vectors, k=2)):
+                match = next(((aid, sim) for aid, sim in neighbours if aid != article_id), None)
+                if match is not None and match[1] >= self.threshold:
+                    matches.append((match[0], f"Sim: {match[1]:.4f}"))
+                else:
+                    matches.append(None)
+            return matches
+
+        collection = get_collection()
+        max_distance = similarity_to_distance(self.threshold, collection_space(collection))
+        # n_results=2 so an article re-checked against its own stored copy still finds another
+        results = collection.query(
+            query_embeddings=vectors.tolist(),
+            n_results=2,
             include=["metadatas", "distances"]
         )
-        
-        is_duplicate = False
-        duplicate_of_id = None
-        
-        if results['ids'] and results['ids'][0]:
-            # Chroma returns distance. Default is L2.
-            # L2 Distance of 0 means identical. 0.3 is usually a good threshold for "very similar".
-            distance = results['distances'][0][0]
-            if distance < 0.3: 
-                is_duplicate = True
-                duplicate_of_id = results['ids'][0][0]
-                print(f"Duplicate found! {article.title} is similar to {duplicate_of_id} (Dist: {distance:.4f})")
-
-        article.is_duplicate = is_duplicate
-        article.duplicate_of_id = duplicate_of_id
-        
-        return article
+        matches = []
+        for q, article_id in enumerate(article_ids):
+            ids = results['ids'][q] if results['ids'] else []
+            distances = results['distances'][q] if results['ids'] else []
+            match = next(((aid, distance) for aid, distance in zip(ids, distances) if aid != article_id), None)
+            # Chroma returns a distance in the collection's space; with the default
+            # squared L2, 0.3 on unit vectors is the 0.85 cosine threshold
+            if match is not None and match[1] < max_distance:
+                matches.append((match[0], f"Dist: {match[1]:.4f}"))
+            else:
+                matches.append(None)
+        return matches
+
+    def cluster_batch(self, articles: List[Article], vectors: np.ndarray) -> List[int]:
+        """
+        Groups articles whose embeddings have cosine similarity >= `self.threshold`
+        and returns, for each row, the row of its cluster's canonical article
+        (the earliest published, then the first seen).
+        """
+        n = len(articles)
+        if n < 2:
+            return list(range(n))
 
-    def add_to_chroma(self, article: Article):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.maximum(norms, 1e-12)
+        similar = np.triu(unit @ unit.T >= self.threshold, k=1)
+
+        # Union-find over every similar pair
+        parent = list(range(n))
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        for a, b in np.argwhere(similar):
+            root_a, root_b = find(int(a)), find(int(b))
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+        clusters = {}
+        for row in range(n):
+            clusters.setdefault(find(row), []).append(row)
+
+        canonical_rows = list(range(n))
+        for members in clusters.values():
+            canonical_row = min(members, key=lambda r: (articles[r].published_at, r))
+            for row in members:
+                canonical_rows[row] = canonical_row
+        return canonical_rows
+
+    def add_to_chroma(self, article: Article, embedding: Optional[List[float]] = None):
         """
-        Adds the article to ChromaDB with full metadata.
+        Stores the article's vector with full metadata.
+        Pass `embedding` to reuse the vector computed during deduplication.
         """
         if article.is_duplicate:
             return
+        if embedding is None:
+            embedding = self.model.encode_one(f"{article.title} {article.content}").tolist()
+        self.add_batch_to_chroma([article], [embedding])
+
+    def add_batch_to_chroma(self, articles: List[Article], embeddings: List[List[float]]):
+        """
+        Stores all unique articles of a batch in one Chroma upsert, reusing
+        the embeddings computed by `process_batch`, and caches them in the
+        hot tier when it is enabled.
+        """
+        unique = [(a, e) for a, e in zip(articles, embeddings) if not a.is_duplicate]
+        if not unique:
+            return
 
-        text_to_embed = f"{article.title} {article.content}"
-        embedding = self.model.encode(text_to_embed).tolist()
-        
-        self.collection.add(
-            documents=[text_to_embed],
-            metadatas=[{"title": article.title, "source": article.source, "sector": article.sector}],
-            ids=[article.id],
-            embeddings=[embedding]
+        ids = [a.id for a, _ in unique]
+        metadatas = [chroma_metadata(a) for a, _ in unique]
+        self.collection.upsert(
+            documents=[f"{a.title} {a.content}" for a, _ in unique] if CHROMA_STORE_DOCUMENTS else None,
+            metadatas=metadatas,
+            ids=ids,
+            embeddings=[e for _, e in unique]
         )
-        print(f"Added to ChromaDB: {article.title} (Sector: {article.sector})")
+        hot_tier = self.hot_tier(len(unique[0][1]))
+        if hot_tier is not None:
+            hot_tier.add(ids, np.asarray([e for _, e in unique], dtype=np.float32), metadatas)
+        print(f"Stored {len(unique)} vectors in ChromaDB{' and the hot tier' if hot_tier is not None else ''}")
+        if self.lexical_index is not None:
+            self.lexical_index.add_many([(a.id, f"{a.title} {a.content}") for a, _ in unique])
@@ -1,19 +1,76 @@
 from app.models.article import Article, Entity, EntityType, ImpactedStock, ImpactType
-from typing import List
+from app.core.rate_limit import TokenBucketRateLimiter
+from app.core.extraction_cache import ExtractionCache, EXTRACTION_PROMPT_VERSION
+from app.core.log_buffer import log_to_file
+from app.core.metrics import ERRORS, LLM_CALLS
+from typing import List, Optional
+import asyncio
 import json
+import os
+import random
+import threading
 from langchain_mistralai import ChatMistralAI
 
+# Async extraction settings
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "4"))
+MISTRAL_REQUESTS_PER_SECOND = float(os.getenv("MISTRAL_REQUESTS_PER_SECOND", "2"))
+MISTRAL_TOKENS_PER_MINUTE = float(os.getenv("MISTRAL_TOKENS_PER_MINUTE", "500000"))
+RATE_LIMIT_MAX_RETRIES = 5
+RATE_LIMIT_BASE_DELAY = 1.0 # seconds, doubled on each retry plus jitter
+EXPECTED_OUTPUT_TOKENS = 500
+EXTRACTION_MODEL = "mistral-small-latest"
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE", "1") == "1"
+
+# Shared by every ExtractionAgent in the process
+_rate_limiter = TokenBucketRateLimiter(MISTRAL_REQUESTS_PER_SECOND, MISTRAL_TOKENS_PER_MINUTE)
+
+def _is_rate_limit_error(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429 or "429" in str(e) or "rate limit" in str(e).lower()
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _extraction_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop blocking callers run extraction on, started
+    in a daemon thread on first use. The LLM's async HTTP client binds to the
+    loop of its first call, so every batch has to run on the same one.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="extraction-loop", daemon=True).start()
+    return _loop
+
+def _run_sync(coro):
+    """Runs a coroutine to completion on the extraction loop and waits for it; safe to call from inside another running loop."""
+    loop = _extraction_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("process_batch called from the extraction loop; await aprocess_batch instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
 class ExtractionAgent:
-    def __init__(self):
-        self.llm = ChatMistralAI(
-            model="mistral-small-latest",
+    def __init__(self, llm=None, rate_limiter: TokenBucketRateLimiter = None, concurrency: int = EXTRACTION_CONCURRENCY, cache: ExtractionCache = None):
+        self.llm = llm or ChatMistralAI(
+            model=EXTRACTION_MODEL,
             temperature=0,
             max_retries=5
         )
+        self.rate_limiter = rate_limiter or _rate_limiter
+        self.concurrency = concurrency
+        if cache is None and EXTRACTION_CACHE_ENABLED:
+            cache = ExtractionCache(version_tag=f"{EXTRACTION_MODEL}:{EXTRACTION_PROMPT_VERSION}")
+        self.cache = cache
 
-    def process(self, article: Article) -> Article:
-        try:
-            prompt = f"""
+    def build_prompt(self, article: Article) -> str:
+        return f"""
             Analyze the following financial news article and extract structured intelligence.
             
             Article Title: "{article.title}"
@@ -44,69 +101,167 @@ class ExtractionAgent:
                 ]
             }}
             """
-            
+
+    def _apply_cached(self, article: Article) -> bool:
+        """Fills the article from the extraction cache. Returns True on a hit."""
+        if self.cache is None:
+            return False
+        try:
+            cached = self.cache.get(article.title, article.content)
+        except Exception as e:
+            ERRORS.inc(component="extraction_cache")
+            print(f"Extraction cache error: {e}")
+            return False
+        if cached is None:
+            return False
+        article.sector = cached["sector"]
+        article.entities = [Entity(**e) for e in cached["entities"]]
+        article.impacted_stocks = [ImpactedStock(**s) for s in cached["impacted_stocks"]]
+        print(f"Extraction cache hit: {article.title}")
+        return True
+
+    def _store_cached(self, article: Article):
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(
+                article.title,
+                article.content,
+                article.sector,
+                [e.model_dump() for e in article.entities],
+                [s.model_dump() for s in article.impacted_stocks],
+            )
+        except Exception as e:
+            print(f"Extraction cache error: {e}")
+
+    def process(self, article: Article) -> Article:
+        if self._apply_cached(article):
+            return article
+        try:
+            prompt = self.build_prompt(article)
+            self.rate_limiter.acquire_sync(len(prompt) // 4 + EXPECTED_OUTPUT_TOKENS)
+            response = self._invoke(prompt)
+            self.apply_response(article, response.content)
+            self._store_cached(article)
+        except Exception as e:
+            self._handle_error(article, e)
+        return article
+
+    def _invoke(self, prompt: str):
+        try:
             response = self.llm.invoke(prompt)
-            # Clean response to ensure valid JSON
-            content = response.content.replace("```json", "").replace("```", "").strip()
-            # Basic JSON repair if needed (simple case)
-            if content.startswith("{{") and not content.startswith("{"): # Mistral sometimes double braces
-                 content = content.replace("{{", "{").replace("}}", "}")
-            
-            try:
+        except Exception as e:
+            LLM_CALLS.inc(purpose="extraction", outcome="rate_limited" if _is_rate_limit_error(e) else "error")
+            raise
+        LLM_CALLS.inc(purpose="extraction", outcome="ok")
+        return response
+
+    async def aprocess(self, article: Article) -> Article:
+        """
+        Async variant of `process`. Waits on the shared rate limiter before each
+        call and backs off with jitter when the provider returns 429.
+        """
+        if self._apply_cached(article):
+            return article
+        try:
+            prompt = self.build_prompt(article)
+            estimated_tokens = len(prompt) // 4 + EXPECTED_OUTPUT_TOKENS
+            for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+                await self.rate_limiter.acquire(estimated_tokens)
+                try:
+                    response = await self.llm.ainvoke(prompt)
+                    LLM_CALLS.inc(purpose="extraction", outcome="ok")
+                    break
+                except Exception as e:
+                    LLM_CALLS.inc(purpose="extraction", outcome="rate_limited" if _is_rate_limit_error(e) else "error")
+                    if not _is_rate_limit_error(e) or attempt == RATE_LIMIT_MAX_RETRIES:
+                        raise
+                    delay = RATE_LIMIT_BASE_DELAY * (2 ** attempt)
+                    await asyncio.sleep(delay + random.uniform(0, delay))
+            self.apply_response(article, response.content)
+            self._store_cached(article)
+        except Exception as e:
+            self._handle_error(article, e)
+        return article
+
+    async def aprocess_batch(self, articles: List[Article]) -> List[Article]:
+        """Extracts a batch concurrently, with at most `self.concurrency` calls in flight."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _bounded(article: Article) -> Article:
+            async with semaphore:
+                return await self.aprocess(article)
+
+        return list(await asyncio.gather(*(_bounded(a) for a in articles)))
+
+    def process_batch(self, articles: List[Article]) -> List[Article]:
+        """Blocking wrapper around `aprocess_batch`."""
+        if not articles:
+            return []
+        return _run_sync(self.aprocess_batch(articles))
+
+    def apply_response(self, article: Article, raw_content: str):
+        """Parses the LLM JSON response and fills sector, entities and impacted stocks."""
+        # Clean response to ensure valid JSON
+        content = raw_content.replace("```json", "").replace("```", "").strip()
+        # Basic JSON repair if needed (simple case)
+        if content.startswith("{{") and not content.startswith("{"): # Mistral sometimes double braces
+             content = content.replace("{{", "{").replace("}}", "}")
+        
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            # Try to find the first { and last }
+            start = content.find("{")
+            end = content.rfind("}")
+            if start != -1 and end != -1:
+                content = content[start:end+1]
                 data = json.loads(content)
-            except json.JSONDecodeError:
-                # Try to find the first { and last }
-                start = content.find("{")
-                end = content.rfind("}")
-                if start != -1 and end != -1:
-                    content = content[start:end+1]
-                    data = json.loads(content)
-                else:
-                    raise
-            
-            article.sector = data.get("sector", "General")
+            else:
+                raise
+        
+        article.sector = data.get("sector", "General")
+        
+        entities = []
+        impacted_stocks = []
+        
+        for item in data.get("entities", []):
+            # Map string type to Enum
+            etype_str = item.get("type", "COMPANY").upper()
+            if "COMPANY" in etype_str: etype = EntityType.COMPANY
+            elif "REGULATOR" in etype_str: etype = EntityType.REGULATOR
+            elif "PERSON" in etype_str: etype = EntityType.PERSON
+            else: etype = EntityType.COMPANY
             
-            entities = []
-            impacted_stocks = []
+            entities.append(Entity(name=item.get("name"), type=etype))
             
-            for item in data.get("entities", []):
-                # Map string type to Enum
-                etype_str = item.get("type", "COMPANY").upper()
-                if "COMPANY" in etype_str: etype = EntityType.COMPANY
-                elif "REGULATOR" in etype_str: etype = EntityType.REGULATOR
-                elif "PERSON" in etype_str: etype = EntityType.PERSON
-                else: etype = EntityType.COMPANY
+            ticker = item.get("ticker")
+            if ticker and ticker != "NONE" and etype == EntityType.COMPANY:
+                # Determine ImpactType based on score
+                score = item.get("impact_score", 0)
+                impact_type = ImpactType.DIRECT
+                if abs(score) < 10: impact_type = ImpactType.SECTOR
                 
-                entities.append(Entity(name=item.get("name"), type=etype))
-                
-                ticker = item.get("ticker")
-                if ticker and ticker != "NONE" and etype == EntityType.COMPANY:
-                    # Determine ImpactType based on score
-                    score = item.get("impact_score", 0)
-                    impact_type = ImpactType.DIRECT
-                    if abs(score) < 10: impact_type = ImpactType.SECTOR
-                    
-                    impacted_stocks.append(ImpactedStock(
-                        symbol=ticker,
-                        confidence=0.9, # High confidence as it's LLM inferred
-                        type=impact_type,
-                        sentiment=item.get("sentiment", "NEUTRAL"),
-                        impact_score=score,
-                        reasoning=item.get("reasoning", "")
-                    ))
-            
-            article.entities = entities
-            article.impacted_stocks = impacted_stocks
+                impacted_stocks.append(ImpactedStock(
+                    symbol=ticker,
+                    confidence=0.9, # High confidence as it's LLM inferred
+                    type=impact_type,
+                    sentiment=item.get("sentiment", "NEUTRAL"),
+                    impact_score=score,
+                    reasoning=item.get("reasoning", "")
+                ))
+        
+        article.entities = entities
+        article.impacted_stocks = impacted_stocks
+        article.extraction_failed = False
 
-            with open("extraction.log", "a") as f:
-                f.write(f"Extracted {len(entities)} entities, Sector: {article.sector}\n")
-            print(f"Extracted {len(entities)} entities, Sector: {article.sector}")
-            
-        except Exception as e:
-            with open("extraction.log", "a") as f:
-                f.write(f"Extraction Error: {e}\n")
-            print(f"Extraction Error: {e}")
-            # Fallback
-            article.sector = "General"
-            
-        return article
+        log_to_file("extraction.log", f"Extracted {len(entities)} entities, Sector: {article.sector}")
+        print(f"Extracted {len(entities)} entities, Sector: {article.sector}")
+
+    def _handle_error(self, article: Article, e: Exception):
+        ERRORS.inc(component="extraction")
+        log_to_file("extraction.log", f"Extraction Error: {e}")
+        print(f"Extraction Error: {e}")
+        # Fallback, flagged so callers can count it
+        article.sector = "General"
+        article.extraction_failed = True
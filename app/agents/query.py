@@ -1,110 +1,325 @@
-from sentence_transformers import SentenceTransformer
-from app.core.database import get_collection, get_sqlite_conn
-from typing import List, Dict, Any
+from app.core.database import get_collection, get_sqlite_conn, search_articles_fts, to_epoch, collection_space, distance_to_similarity
+from app.core.hot_tier import get_hot_tier
+from app.core.model_registry import get_embedding_model
+from app.core.expansion_cache import ExpansionCache
+from app.core.metrics import ERRORS, LLM_CALLS
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import base64
 import json
+import os
+import threading
 
-# Reuse model (should be singleton)
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Query expansion cache settings
+EXPANSION_MODEL = "mistral-large-latest"
+EXPANSION_CACHE_TTL = float(os.getenv("EXPANSION_CACHE_TTL", str(6 * 60 * 60)))
+EXPANSION_CACHE_SIZE = int(os.getenv("EXPANSION_CACHE_SIZE", "1024"))
+EXPANSION_CACHE_PERSIST = os.getenv("EXPANSION_CACHE_PERSIST", "0") == "1"
+
+# Hybrid search settings
+SEARCH_RESULTS = 5
+CANDIDATES_PER_RETRIEVER = 20
+RRF_K = 60
+# Candidates per retriever for a paginated search, fixed by its first page
+PAGINATION_DEPTH = int(os.getenv("PAGINATION_DEPTH", "100"))
+# Deepest result offset reachable by paging
+MAX_SEARCH_DEPTH = 500
+
+# Runs the keyword side while the calling thread does the vector side
+_search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="keyword-search")
+
+# Recency decay: an article loses half its recency score every N hours
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "12"))
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> Dict[str, float]:
+    """Merges ranked id lists; each list contributes 1 / (k + rank) per id. Returns id -> score."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, article_id in enumerate(ranking):
+            scores[article_id] = scores.get(article_id, 0.0) + 1.0 / (k + rank + 1)
+    return scores
+
+def encode_cursor(offset: int, depth: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset, "depth": depth}).encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, Optional[int]]:
+    """
+    Returns the (result offset, candidate depth) encoded in `cursor`, or
+    (0, None) for the first page; raises ValueError if it is malformed.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset, depth = int(data["offset"]), int(data["depth"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0 or not 0 < depth <= MAX_SEARCH_DEPTH:
+        raise ValueError("Invalid cursor")
+    return offset, depth
+
+def _local_naive(value: Optional[datetime]) -> Optional[datetime]:
+    # published_at is stored as naive local time
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
 
 class QueryAgent:
-    def __init__(self):
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    def __init__(self, llm=None, expansion_cache: ExpansionCache = None):
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+        self.expansion_cache = expansion_cache or ExpansionCache(
+            ttl=EXPANSION_CACHE_TTL,
+            max_entries=EXPANSION_CACHE_SIZE,
+            persist=EXPANSION_CACHE_PERSIST
+        )
+
+    @property
+    def model(self):
+        # Shared across agents, loaded on first use
+        return get_embedding_model()
+
+    @property
+    def llm(self):
+        # Long-lived client, created on first use and reused across requests
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from langchain_mistralai import ChatMistralAI
+                    # Using mistral-large-latest as requested
+                    self._llm = ChatMistralAI(
+                        model=EXPANSION_MODEL,
+                        temperature=0,
+                        max_retries=2
+                    )
+        return self._llm
 
     def expand_query(self, query: str) -> Dict[str, Any]:
         """
         Real AI expansion using an LLM (Mistral).
         Returns dict with expanded terms and target sector.
+        Results are cached per normalized query and concurrent identical
+        queries share a single LLM call.
         """
         try:
-            from langchain_mistralai import ChatMistralAI
-            # Using mistral-large-latest as requested
-            llm = ChatMistralAI(
-                model="mistral-large-latest",
-                temperature=0,
-                max_retries=2
-            )
-            
-            prompt = f"""
-            You are a financial trading assistant. The user is searching for: "{query}".
-            
-            Task:
-            1. Identify the Target Sector (e.g., Banking, IT, Energy, Auto, Pharma). If unclear, use "General".
-            2. Generate 3-5 related search terms (synonyms, tickers, regulators).
-            
-            Return ONLY a valid JSON object:
-            {{
-                "sector": "Sector Name",
-                "terms": ["term1", "term2", "term3"]
-            }}
-            """
-            
-            response = llm.invoke(prompt)
-            content = response.content.replace("```json", "").replace("```", "").strip()
-            data = json.loads(content)
-            
-            terms = data.get("terms", [])
-            terms.append(query)
-            
-            return {
-                "terms": list(set(terms)),
-                "sector": data.get("sector", "General")
-            }
-            
+            return self.expansion_cache.get_or_compute(query, self._expand_with_llm)
         except Exception as e:
+            ERRORS.inc(component="query_expansion")
             print(f"LLM Error (Context Expansion): {e}")
-            # Fallback
+            # Fallback (not cached, so the next request retries the LLM)
             return {
                 "terms": [query],
                 "sector": "General"
             }
 
-    def search(self, query: str) -> Dict[str, Any]:
-        from app.core.database import get_collection, get_article_from_sqlite
-        collection = get_collection()
+    def _expand_with_llm(self, query: str) -> Dict[str, Any]:
+        prompt = f"""
+        You are a financial trading assistant. The user is searching for: "{query}".
+        
+        Task:
+        1. Identify the Target Sector (e.g., Banking, IT, Energy, Auto, Pharma). If unclear, use "General".
+        2. Generate 3-5 related search terms (synonyms, tickers, regulators).
         
-        # 1. Expand Query
-        expansion_result = self.expand_query(query)
+        Return ONLY a valid JSON object:
+        {{
+            "sector": "Sector Name",
+            "terms": ["term1", "term2", "term3"]
+        }}
+        """
+        
+        try:
+            response = self.llm.invoke(prompt)
+        except Exception:
+            LLM_CALLS.inc(purpose="query_expansion", outcome="error")
+            raise
+        LLM_CALLS.inc(purpose="query_expansion", outcome="ok")
+        content = response.content.replace("```json", "").replace("```", "").strip()
+        data = json.loads(content)
+        
+        terms = data.get("terms", [])
+        terms.append(query)
+        
+        return {
+            "terms": list(set(terms)),
+            "sector": data.get("sector", "General")
+        }
+
+    def search(self, query: str, expand: bool = True, since: Optional[datetime] = None, until: Optional[datetime] = None, recency_weight: float = 0.0, limit: int = SEARCH_RESULTS, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Hybrid search. `since`/`until` bound published_at and are pushed down
+        into both retrievers; `recency_weight` (0-1) blends an exponential
+        freshness score into the fused relevance ranking.
+        Returns one page of `limit` results plus a `next_cursor` for the next page.
+        """
+        offset, depth = self._page_window(cursor, limit)
+        expansion_result, article_ids = self.rank(query, expand, since, until, recency_weight, depth=depth)
+        page_ids = article_ids[offset:offset + limit]
+
+        # 4. Retrieve full details from SQLite
+        articles = self._hydrate(page_ids)
+                
+        return {
+            "query": query,
+            "expanded_context": expansion_result["terms"],
+            "target_sector": expansion_result["sector"],
+            "results": articles,
+            "next_cursor": self._next_cursor(article_ids, offset, limit, depth)
+        }
+
+    def search_stream(self, query: str, expand: bool = True, since: Optional[datetime] = None, until: Optional[datetime] = None, recency_weight: float = 0.0, limit: int = SEARCH_RESULTS, cursor: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of `search`: yields the expansion metadata first,
+        then each article as soon as it is hydrated, then an end marker
+        carrying `next_cursor`.
+        """
+        offset, depth = self._page_window(cursor, limit)
+        expansion_result, article_ids = self.rank(query, expand, since, until, recency_weight, depth=depth)
+        yield {
+            "type": "expansion",
+            "query": query,
+            "expanded_context": expansion_result["terms"],
+            "target_sector": expansion_result["sector"]
+        }
+        for article_id in article_ids[offset:offset + limit]:
+            articles = self._hydrate([article_id])
+            if articles:
+                yield {"type": "article", "article": articles[0]}
+        yield {"type": "end", "next_cursor": self._next_cursor(article_ids, offset, limit, depth)}
+
+    def rank(self, query: str, expand: bool = True, since: Optional[datetime] = None, until: Optional[datetime] = None, recency_weight: float = 0.0, depth: int = SEARCH_RESULTS) -> Tuple[Dict[str, Any], List[str]]:
+        """Returns (expansion, ranked article ids) with at least `depth` candidates per retriever."""
+        since, until = _local_naive(since), _local_naive(until)
+        depth = min(max(depth, CANDIDATES_PER_RETRIEVER), MAX_SEARCH_DEPTH)
+
+        # 1. Expand Query (optional; keyword + vector search work without it)
+        if expand:
+            expansion_result = self.expand_query(query)
+        else:
+            expansion_result = {"terms": [query], "sector": "General"}
         expanded_queries = expansion_result["terms"]
         target_sector = expansion_result["sector"]
         
         print(f"Expanded Query: {expanded_queries}, Target Sector: {target_sector}")
-        
-        # 2. Vector Search with Sector Filter
+
+        # 2. Keyword (BM25) and vector search in parallel
+        keyword_future = _search_executor.submit(self._keyword_search, query, expanded_queries, target_sector, since, until, depth)
+        vector_ids = self._vector_search(query, expanded_queries, target_sector, since, until, depth)
+        keyword_ids = keyword_future.result()
+
+        # Only widen the vector search when neither side found anything in the sector
+        if not vector_ids and not keyword_ids and target_sector != "General":
+            print("No results with filter. Retrying without filter.")
+            vector_ids = self._vector_search(query, expanded_queries, None, since, until, depth)
+
+        # 3. Merge rankings with reciprocal-rank fusion (+ optional recency decay)
+        scores = reciprocal_rank_fusion([vector_ids, keyword_ids])
+        if recency_weight > 0 and scores:
+            scores = self._apply_recency(scores, recency_weight)
+        return expansion_result, sorted(scores, key=lambda aid: scores[aid], reverse=True)
+
+    def _page_window(self, cursor: Optional[str], limit: int) -> Tuple[int, int]:
+        """
+        Returns (offset, depth) for a page. The first page picks the candidate
+        depth and the cursor carries it, so every page ranks the same fused
+        list; a deeper list would reshuffle RRF scores and repeat or skip results.
+        """
+        offset, depth = decode_cursor(cursor)
+        if depth is None:
+            depth = min(max(PAGINATION_DEPTH, CANDIDATES_PER_RETRIEVER, limit), MAX_SEARCH_DEPTH)
+        return offset, depth
+
+    def _next_cursor(self, article_ids: List[str], offset: int, limit: int, depth: int) -> Optional[str]:
+        next_offset = offset + limit
+        if next_offset >= len(article_ids) or next_offset >= MAX_SEARCH_DEPTH:
+            return None
+        return encode_cursor(next_offset, depth)
+
+    def _vector_search(self, query: str, expanded_queries: List[str], target_sector: Optional[str], since: Optional[datetime] = None, until: Optional[datetime] = None, depth: int = CANDIDATES_PER_RETRIEVER) -> List[str]:
+        collection = get_collection()
         search_text = query + " " + " ".join(expanded_queries[:2])
-        query_embedding = self.model.encode(search_text).tolist()
-        
-        # Construct filter
+        query_embedding = self.model.encode_one(search_text).tolist()
+
+        # Construct filter; everything is pushed down into Chroma's where clause
+        conditions = []
+        if target_sector and target_sector != "General":
+            # Strict filtering if sector is detected, to reduce noise.
+            conditions.append({"sector": target_sector})
+        if since is not None:
+            conditions.append({"published_at": {"$gte": int(since.timestamp())}})
+        if until is not None:
+            conditions.append({"published_at": {"$lte": int(until.timestamp())}})
+
         where_filter = None
-        if target_sector != "General":
-            # We use $or to allow articles from the specific sector OR General (optional, but strict filtering is better for relevance)
-            # For now, let's try strict filtering if sector is detected, but maybe relax if no results?
-            # Let's stick to strict filtering as per requirements to reduce noise.
-            where_filter = {"sector": target_sector}
-            
+        if len(conditions) == 1:
+            where_filter = conditions[0]
+        elif conditions:
+            where_filter = {"$and": conditions}
+
+        # Cold tier (Chroma) and hot tier (recent, in memory) merged by cosine similarity
+        similarities: Dict[str, float] = {}
         try:
             results = collection.query(
                 query_embeddings=[query_embedding],
-                n_results=5,
+                n_results=depth,
                 where=where_filter,
-                include=["metadatas", "distances", "documents"]
+                include=["distances"]
             )
+            if results['ids']:
+                space = collection_space(collection)
+                for aid, distance in zip(results['ids'][0], results['distances'][0]):
+                    similarities[aid] = distance_to_similarity(distance, space)
         except Exception as e:
-            print(f"Query Error with filter: {e}. Retrying without filter.")
-            results = None
+            print(f"Vector Query Error: {e}")
 
-        # Fallback if no results found with filter
-        if not results or not results['ids'] or not results['ids'][0]:
-            print("No results with filter. Retrying without filter.")
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=5,
-                include=["metadatas", "distances", "documents"]
-            )
-        
-        # 3. Retrieve full details from SQLite
-        article_ids = results['ids'][0] if results['ids'] else []
+        hot_tier = get_hot_tier(self.model.dim)
+        if hot_tier is not None:
+            hot = hot_tier.search(
+                query_embedding,
+                k=depth,
+                sector=target_sector if target_sector and target_sector != "General" else None,
+                since=int(since.timestamp()) if since is not None else None,
+                until=int(until.timestamp()) if until is not None else None,
+            )[0]
+            for aid, similarity in hot:
+                similarities[aid] = max(similarity, similarities.get(aid, similarity))
+
+        return sorted(similarities, key=similarities.get, reverse=True)[:depth]
+
+    def _keyword_search(self, query: str, expanded_queries: List[str], target_sector: Optional[str], since: Optional[datetime] = None, until: Optional[datetime] = None, depth: int = CANDIDATES_PER_RETRIEVER) -> List[str]:
+        sector = target_sector if target_sector and target_sector != "General" else None
+        terms = [query] + [t for t in expanded_queries if t != query]
+        # Split the raw query too, so tickers like "HDFCBANK" match on their own
+        terms += query.split()
+        ids = search_articles_fts(terms, limit=depth, sector=sector, since=since, until=until)
+        if not ids and sector:
+            ids = search_articles_fts(terms, limit=depth, since=since, until=until)
+        return ids
+
+    def _apply_recency(self, scores: Dict[str, float], recency_weight: float) -> Dict[str, float]:
+        """Blends normalized relevance with 0.5 ** (age / half-life)."""
+        recency_weight = min(max(recency_weight, 0.0), 1.0)
+        ids = list(scores)
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' for _ in ids)
+        cursor.execute(f"SELECT id, published_at FROM articles WHERE id IN ({placeholders})", ids)
+        published = {row[0]: row[1] for row in cursor.fetchall()}
+        conn.close()
+
+        now = datetime.now().timestamp()
+        top = max(scores.values())
+        blended = {}
+        for aid, score in scores.items():
+            freshness = 0.0
+            if published.get(aid):
+                age_hours = max(0.0, (now - to_epoch(published[aid])) / 3600)
+                freshness = 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+            blended[aid] = (1 - recency_weight) * (score / top) + recency_weight * freshness
+        return blended
+
+    def _hydrate(self, article_ids: List[str]) -> List[Dict[str, Any]]:
         articles = []
-        
         if article_ids:
             conn = get_sqlite_conn()
             placeholders = ','.join('?' for _ in article_ids)
@@ -125,10 +340,4 @@ class QueryAgent:
                     if article['impacted_stocks_json']:
                         article['impacted_stocks'] = json.loads(article['impacted_stocks_json'])
                     articles.append(article)
-                
-        return {
-            "query": query,
-            "expanded_context": expanded_queries,
-            "target_sector": target_sector,
-            "results": articles
-        }
+        return articles
@@ -1,24 +1,48 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated
+from typing import TypedDict, Annotated, List, Optional
 from app.models.article import Article
 from app.agents.deduplication import DeduplicationAgent
 from app.agents.extraction import ExtractionAgent
-from app.core.database import save_article_to_sqlite
+from app.core.database import save_article_to_sqlite, save_articles_to_sqlite
+from app.core.storage_buffer import StorageBuffer
+from app.core.metrics import timed_node
+import os
 
 # Define State
 class AgentState(TypedDict):
     article: Article
+    embedding: Optional[List[float]]
+
+class BatchAgentState(TypedDict):
+    articles: List[Article]
+    embeddings: List[List[float]]
+
+# Storage batching
+STORAGE_BATCH_SIZE = int(os.getenv("STORAGE_BATCH_SIZE", "200"))
+STORAGE_FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "2.0"))
 
 # Initialize Agents
 dedup_agent = DeduplicationAgent()
 extraction_agent = ExtractionAgent()
 
+def flush_stored_articles(items):
+    """Writes (article, embedding) pairs with one SQLite transaction and one Chroma upsert."""
+    articles = [article for article, _ in items]
+    save_articles_to_sqlite([article.model_dump() for article in articles])
+    dedup_agent.add_batch_to_chroma(articles, [embedding for _, embedding in items])
+    print(f"Flushed {len(articles)} articles to storage")
+
+storage_buffer = StorageBuffer(flush_stored_articles, batch_size=STORAGE_BATCH_SIZE, flush_interval=STORAGE_FLUSH_INTERVAL)
+
 # Node Functions
+@timed_node("single", "deduplication")
 def deduplication_node(state: AgentState):
     article = state['article']
-    processed_article = dedup_agent.process(article)
-    return {"article": processed_article}
+    # Batch of one so the embedding can be reused by the storage node
+    embeddings = dedup_agent.process_batch([article])
+    return {"article": article, "embedding": embeddings[0]}
 
+@timed_node("single", "extraction")
 def extraction_node(state: AgentState):
     article = state['article']
     # Only extract if not a duplicate (optimization)
@@ -27,16 +51,41 @@ def extraction_node(state: AgentState):
         return {"article": processed_article}
     return {"article": article}
 
+@timed_node("single", "storage")
 def storage_node(state: AgentState):
     article = state['article']
     save_article_to_sqlite(article.model_dump())
-    
+
     # Add to ChromaDB (now that extraction is done and sector is available)
-    dedup_agent.add_to_chroma(article)
-    
+    dedup_agent.add_to_chroma(article, embedding=state.get('embedding'))
+
     print(f"Stored article: {article.id}")
     return {"article": article}
 
+# Batch Node Functions
+@timed_node("batch", "deduplication")
+def batch_deduplication_node(state: BatchAgentState):
+    articles = state['articles']
+    embeddings = dedup_agent.process_batch(articles)
+    return {"articles": articles, "embeddings": embeddings}
+
+@timed_node("batch", "extraction")
+def batch_extraction_node(state: BatchAgentState):
+    articles = state['articles']
+    # Fan out extraction for the unique articles; processed in place
+    extraction_agent.process_batch([a for a in articles if not a.is_duplicate])
+    return {"articles": articles}
+
+@timed_node("batch", "storage")
+def batch_storage_node(state: BatchAgentState):
+    articles = state['articles']
+    storage_buffer.add(list(zip(articles, state['embeddings'])))
+    # End of the cycle: make everything searchable before returning
+    storage_buffer.flush()
+
+    print(f"Stored batch of {len(articles)} articles")
+    return {"articles": articles}
+
 # Build Graph
 workflow = StateGraph(AgentState)
 
@@ -51,3 +100,18 @@ workflow.add_edge("extraction", "storage")
 workflow.add_edge("storage", END)
 
 app_workflow = workflow.compile()
+
+# Build Batch Graph (one fetch cycle per invocation)
+batch_workflow = StateGraph(BatchAgentState)
+
+batch_workflow.add_node("deduplication", batch_deduplication_node)
+batch_workflow.add_node("extraction", batch_extraction_node)
+batch_workflow.add_node("storage", batch_storage_node)
+
+batch_workflow.set_entry_point("deduplication")
+
+batch_workflow.add_edge("deduplication", "extraction")
+batch_workflow.add_edge("extraction", "storage")
+batch_workflow.add_edge("storage", END)
+
+app_batch_workflow = batch_workflow.compile()
@@ -1,58 +1,139 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.article import ArticleCreate
 from app.ingestion.feed_poller import IngestionService
-from app.agents.query import QueryAgent
-from typing import List, Dict, Any
+from app.ingestion.jobs import IngestionJobManager
+from app.agents.query import QueryAgent, decode_cursor
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+import json
 
 router = APIRouter()
 query_agent = QueryAgent()
-ingestion_service = IngestionService() # Note: In a real app, this should be a background task/singleton
+ingestion_service = IngestionService()
+ingestion_jobs = IngestionJobManager(ingestion_service)
 
 @router.post("/ingest", response_model=Dict[str, str])
-async def trigger_ingestion():
+def trigger_ingestion():
     """
-    Triggers a real ingestion cycle from RSS feeds.
+    Queues an ingestion cycle from RSS feeds on the background worker and
+    returns its job id immediately. If a job is already queued or running,
+    that job's id is returned instead of starting another.
     """
-    # In a real app, this should trigger a background task
-    print("DEBUG: /ingest endpoint hit")
-    articles = ingestion_service.fetch_from_feeds()
-    count = 0
-    for article_create in articles:
-        ingestion_service.process_article(article_create)
-        count += 1
-        
-    return {"message": f"Ingested {count} articles from RSS feeds", "id": "batch"}
+    job, created = ingestion_jobs.submit()
+    if created:
+        message = "Ingestion job queued"
+    else:
+        message = f"Ingestion job already {job.status}"
+    return {"message": message, "id": job.id, "status": job.status}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    Progress of an ingestion job: fetched/processed/duplicates/skipped/errors.
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 @router.get("/query")
-async def query_news(q: str):
+def query_news(q: str, expand: bool = True, since: Optional[datetime] = None, until: Optional[datetime] = None, recency_weight: float = 0.0, limit: int = 5, cursor: Optional[str] = None):
     """
     Natural language query for financial news.
+    Declared sync so FastAPI runs it in its threadpool and concurrent
+    queries do not block each other or the event loop.
+    Pass `expand=false` to skip the LLM expansion and search on the raw query.
+    `since`/`until` (ISO timestamps) bound published_at; `recency_weight` (0-1)
+    favours fresher articles. Page with `limit` and the returned `next_cursor`.
+    """
+    _validate_query_params(q, recency_weight, limit)
+    try:
+        results = query_agent.search(q, expand=expand, since=since, until=until, recency_weight=recency_weight, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return results
+
+@router.get("/query/stream")
+def query_news_stream(q: str, expand: bool = True, since: Optional[datetime] = None, until: Optional[datetime] = None, recency_weight: float = 0.0, limit: int = 5, cursor: Optional[str] = None, format: str = "ndjson"):
+    """
+    Streaming variant of /query. Emits the expansion metadata first, then
+    each article as soon as it is hydrated, then an end event with `next_cursor`.
+    `format` is "ndjson" (one JSON object per line) or "sse" (Server-Sent Events).
     """
+    _validate_query_params(q, recency_weight, limit)
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    try:
+        decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    events = query_agent.search_stream(q, expand=expand, since=since, until=until, recency_weight=recency_weight, limit=limit, cursor=cursor)
+
+    def encode():
+        for event in events:
+            payload = json.dumps(event, default=str)
+            if format == "sse":
+                yield f"event: {event['type']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(encode(), media_type=media_type)
+
+def _validate_query_params(q: str, recency_weight: float, limit: int):
     if not q:
         raise HTTPException(status_code=400, detail="Query string is required")
-    
-    results = query_agent.search(q)
-    return results
+    if not 0 <= recency_weight <= 1:
+        raise HTTPException(status_code=400, detail="recency_weight must be between 0 and 1")
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
 
 @router.get("/stats")
-async def get_stats():
+def get_stats(throughput_minutes: int = 15):
     """
     Returns system statistics.
+    Read from counters maintained by the storage stage, so cost does not grow with the archive.
     """
-    from app.core.database import get_sqlite_conn
-    conn = get_sqlite_conn()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM articles")
-    total = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM articles WHERE is_duplicate = 1")
-    duplicates = cursor.fetchone()[0]
-    
-    conn.close()
-    
+    from app.core.database import get_stats_snapshot
+    snapshot = get_stats_snapshot(throughput_minutes=throughput_minutes)
+    total = snapshot["total"]
+    duplicates = snapshot["duplicates"]
+
     return {
         "total_articles": total,
         "duplicates_detected": duplicates,
-        "unique_articles": total - duplicates
+        "unique_articles": total - duplicates,
+        "by_sector": snapshot["by_sector"],
+        "by_source": snapshot["by_source"],
+        "ingest_throughput": {
+            "window_minutes": snapshot["ingested_last_minutes"],
+            "articles": snapshot["ingested_recent"],
+            "per_minute": snapshot["ingest_rate_per_minute"]
+        }
+    }
+
+@router.get("/stocks/{symbol}")
+def get_stock_news(symbol: str, hours: float = 24, limit: int = 20, offset: int = 0, include_duplicates: bool = False):
+    """
+    News impacting a stock symbol within the last `hours`, newest first.
+    Served from the indexed article_impacts table, paginated with limit/offset.
+    """
+    from app.core.database import get_articles_for_symbol
+    if limit < 1 or limit > 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be non-negative")
+
+    since = datetime.now() - timedelta(hours=hours) if hours > 0 else None
+    articles = get_articles_for_symbol(symbol, since=since, limit=limit, offset=offset, include_duplicates=include_duplicates)
+
+    return {
+        "symbol": symbol.upper(),
+        "since": since,
+        "results": articles,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(articles) == limit else None
     }
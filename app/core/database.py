@@ -2,73 +2,282 @@ import sqlite3
 import chromadb
 from chromadb.config import Settings
 import os
-from typing import List, Dict, Any
+import shutil
+from typing import List, Dict, Any, Optional, Tuple
 import json
+import threading
+import time
 from datetime import datetime
 
 # SQLite Setup
 SQLITE_DB_PATH = os.path.abspath("articles.db")
 
+# Connection tuning. WAL lets readers run alongside the ingest writer.
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",       # safe with WAL, avoids an fsync per commit
+    "PRAGMA cache_size=-65536",        # 64 MB page cache per connection
+    "PRAGMA mmap_size=268435456",      # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+]
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS articles (
+        id TEXT PRIMARY KEY,
+        title TEXT,
+        content TEXT,
+        source TEXT,
+        published_at TIMESTAMP,
+        url TEXT,
+        is_duplicate BOOLEAN DEFAULT 0,
+        duplicate_of_id TEXT,
+        entities_json TEXT,
+        impacted_stocks_json TEXT,
+        sector TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS extraction_cache (
+        key TEXT PRIMARY KEY,
+        sector TEXT,
+        entities_json TEXT,
+        impacted_stocks_json TEXT,
+        created_at REAL,
+        last_used_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used ON extraction_cache(last_used_at)",
+    """
+    CREATE TABLE IF NOT EXISTS query_expansion_cache (
+        key TEXT PRIMARY KEY,
+        value_json TEXT,
+        expires_at REAL
+    )
+    """,
+    # Normalized entities / impacts, kept in sync with the JSON blobs on articles
+    """
+    CREATE TABLE IF NOT EXISTS article_entities (
+        article_id TEXT NOT NULL,
+        name TEXT,
+        type TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS article_impacts (
+        article_id TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        type TEXT,
+        sentiment TEXT,
+        impact_score INTEGER,
+        confidence REAL,
+        reasoning TEXT,
+        sector TEXT,
+        published_at TIMESTAMP,
+        is_duplicate BOOLEAN DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_articles_sector ON articles(sector)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles(published_at)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_is_duplicate ON articles(is_duplicate)",
+    "CREATE INDEX IF NOT EXISTS idx_article_entities_article ON article_entities(article_id)",
+    "CREATE INDEX IF NOT EXISTS idx_article_entities_name ON article_entities(name)",
+    "CREATE INDEX IF NOT EXISTS idx_article_impacts_article ON article_impacts(article_id)",
+    "CREATE INDEX IF NOT EXISTS idx_article_impacts_symbol ON article_impacts(symbol, published_at)",
+    "CREATE INDEX IF NOT EXISTS idx_article_impacts_sector ON article_impacts(sector, published_at)",
+    # Incrementally maintained counters, so /stats never scans articles
+    """
+    CREATE TABLE IF NOT EXISTS stats (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingest_throughput (
+        minute INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # Lexical near-duplicate signatures (see app/core/simhash_index.py)
+    """
+    CREATE TABLE IF NOT EXISTS simhash_index (
+        article_id TEXT PRIMARY KEY,
+        signature INTEGER NOT NULL
+    )
+    """,
+    # Append-only log of recent vectors shared by every process's hot tier (see app/core/hot_tier.py)
+    """
+    CREATE TABLE IF NOT EXISTS hot_vectors (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        collection TEXT NOT NULL,
+        article_id TEXT NOT NULL,
+        published_at INTEGER NOT NULL,
+        metadata_json TEXT NOT NULL,
+        vector BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_hot_vectors_collection ON hot_vectors(collection, seq)",
+    "CREATE INDEX IF NOT EXISTS idx_hot_vectors_published_at ON hot_vectors(published_at)",
+    # Small key/value store for operational state (active vector collection, re-index checkpoints)
+    """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+    # Keyword index for hybrid search (unique articles only, like the vector store)
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        article_id UNINDEXED,
+        title,
+        content,
+        tickers,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+def _migrate_normalized_tables(cursor: sqlite3.Cursor):
+    """Backfills article_entities / article_impacts from existing JSON blobs."""
+    cursor.execute("SELECT id, published_at, is_duplicate, sector, entities_json, impacted_stocks_json FROM articles")
+    rows = cursor.fetchall()
+    for row in rows:
+        _write_normalized_rows(cursor, {
+            'id': row[0],
+            'published_at': row[1],
+            'is_duplicate': row[2],
+            'sector': row[3],
+            'entities': json.loads(row[4]) if row[4] else [],
+            'impacted_stocks': json.loads(row[5]) if row[5] else [],
+        })
+    print(f"Backfilled normalized entity/impact tables for {len(rows)} articles")
+
+def _migrate_stats_table(cursor: sqlite3.Cursor):
+    _rebuild_stats(cursor)
+    print("Backfilled stats table")
+
+def _migrate_fts_index(cursor: sqlite3.Cursor):
+    """Backfills articles_fts from existing unique articles."""
+    cursor.execute("DELETE FROM articles_fts")
+    cursor.execute('''
+    INSERT INTO articles_fts (article_id, title, content, tickers)
+    SELECT a.id, a.title, a.content, COALESCE((SELECT group_concat(i.symbol, ' ') FROM article_impacts i WHERE i.article_id = a.id), '')
+    FROM articles a WHERE a.is_duplicate = 0
+    ''')
+    print(f"Backfilled keyword index with {cursor.rowcount} articles")
+
+# Data migrations, applied in order and tracked with PRAGMA user_version
+MIGRATIONS = [
+    _migrate_normalized_tables,
+    _migrate_stats_table,
+    _migrate_fts_index,
+]
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Thread-local connection handed out by `get_sqlite_conn`.
+    `close()` only ends any open transaction so the connection can be reused
+    by the next caller on the same thread; `close_for_real()` closes it.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def close_for_real(self):
+        super().close()
+
+_local = threading.local()
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def _connect() -> PooledConnection:
+    conn = sqlite3.connect(SQLITE_DB_PATH, factory=PooledConnection)
+    conn.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _create_schema(conn: sqlite3.Connection):
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        cursor = conn.cursor()
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        conn.commit()
+
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for index in range(version, len(MIGRATIONS)):
+            with conn:
+                MIGRATIONS[index](conn.cursor())
+                conn.execute(f"PRAGMA user_version = {index + 1}")
+        _schema_ready = True
+
 def get_sqlite_conn():
+    """
+    Returns this thread's pooled SQLite connection, opening it on first use.
+    Callers may still call `conn.close()`; it only releases the transaction.
+    """
     import time
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        return conn
+
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            conn = sqlite3.connect(SQLITE_DB_PATH)
-            conn.row_factory = sqlite3.Row
-            
-            # Fail-safe: Ensure table exists
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS articles (
-                    id TEXT PRIMARY KEY,
-                    title TEXT,
-                    content TEXT,
-                    source TEXT,
-                    published_at TIMESTAMP,
-                    url TEXT,
-                    is_duplicate BOOLEAN DEFAULT 0,
-                    duplicate_of_id TEXT,
-                    entities_json TEXT,
-                    impacted_stocks_json TEXT,
-                    sector TEXT
-                )
-            """)
-            conn.commit()
+            conn = _connect()
+            # Fail-safe for scripts that skip init_db; runs once per process
+            if not _schema_ready:
+                _create_schema(conn)
+            _local.conn = conn
             return conn
         except sqlite3.OperationalError as e:
             if attempt == max_retries - 1:
                 raise e
             time.sleep(0.5)
 
+def close_sqlite_conn():
+    """Closes this thread's pooled connection, if any."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close_for_real()
+        _local.conn = None
+
 def init_sqlite():
+    global _schema_ready
     print(f"Initializing SQLite at {SQLITE_DB_PATH}")
-    conn = sqlite3.connect(SQLITE_DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS articles (
-            id TEXT PRIMARY KEY,
-            title TEXT,
-            content TEXT,
-            source TEXT,
-            published_at TIMESTAMP,
-            url TEXT,
-            is_duplicate BOOLEAN DEFAULT 0,
-            duplicate_of_id TEXT,
-            entities_json TEXT,
-            impacted_stocks_json TEXT,
-            sector TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    conn = get_sqlite_conn()
+    _schema_ready = False
+    _create_schema(conn)
     print("SQLite initialized.")
 
 # ChromaDB Setup
 CHROMA_DB_PATH = "chroma_db_v2"
 
+# HNSW index settings. Space, M and construction_ef are fixed when a collection
+# is created (run compact_vector_store.py to rebuild); search_ef can change any time.
+CHROMA_SPACE = os.getenv("CHROMA_SPACE", "l2") # l2 | cosine | ip
+CHROMA_HNSW_M = int(os.getenv("CHROMA_HNSW_M", "16"))
+CHROMA_CONSTRUCTION_EF = int(os.getenv("CHROMA_CONSTRUCTION_EF", "100"))
+CHROMA_SEARCH_EF = int(os.getenv("CHROMA_SEARCH_EF", "100"))
+# Article text lives in SQLite; only keep a second copy in Chroma if asked to
+CHROMA_STORE_DOCUMENTS = os.getenv("CHROMA_STORE_DOCUMENTS", "0") == "1"
+
+DEFAULT_COLLECTION = "articles"
+ACTIVE_COLLECTION_KEY = "active_collection"
+ACTIVE_COLLECTION_REFRESH = 5.0 # seconds
+
 # Global client to avoid re-initializing
 _chroma_client = None
+_collections: Dict[str, Any] = {}
+_active_name: Optional[str] = None
+_active_checked = 0.0
+_current_name: Optional[str] = None
+_mismatched_names = set()
 
 def get_chroma_client():
     global _chroma_client
@@ -77,30 +286,277 @@ def get_chroma_client():
         _chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
     return _chroma_client
 
-def get_collection(name="articles"):
+def hnsw_configuration() -> Dict[str, Any]:
+    return {
+        "space": CHROMA_SPACE,
+        "max_neighbors": CHROMA_HNSW_M,
+        "ef_construction": CHROMA_CONSTRUCTION_EF,
+        "ef_search": CHROMA_SEARCH_EF,
+    }
+
+def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
+    conn = get_sqlite_conn()
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+    conn.close()
+    return row[0] if row else default
+
+def set_setting(key: str, value: Optional[str]):
+    """Writes (or with value=None deletes) a setting in its own transaction."""
+    conn = get_sqlite_conn()
+    with conn:
+        if value is None:
+            conn.execute("DELETE FROM settings WHERE key = ?", (key,))
+        else:
+            conn.execute("INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+    conn.close()
+
+def active_collection_name() -> str:
+    """
+    Name of the collection readers and writers should use. Re-indexing
+    switches it with a single settings write; other processes pick the
+    change up within ACTIVE_COLLECTION_REFRESH seconds.
+    """
+    global _active_name, _active_checked
+    now = time.monotonic()
+    if _active_name is None or now - _active_checked >= ACTIVE_COLLECTION_REFRESH:
+        _active_name = get_setting(ACTIVE_COLLECTION_KEY, DEFAULT_COLLECTION)
+        _active_checked = now
+    return _active_name
+
+def set_active_collection(name: str):
+    global _active_name, _active_checked
+    set_setting(ACTIVE_COLLECTION_KEY, name)
+    _active_name, _active_checked = name, time.monotonic()
+
+def _running_embedder() -> Tuple[str, str]:
+    """(backend, model) this process embeds with."""
+    from app.core.embedders import EMBEDDING_BACKEND
+    from app.core.model_registry import DEFAULT_EMBEDDING_MODEL
+    return EMBEDDING_BACKEND, DEFAULT_EMBEDDING_MODEL
+
+def _embedder_matches(metadata: Optional[Dict[str, Any]]) -> bool:
+    """Whether a collection's recorded embedder (if any) is the one this process embeds with."""
+    backend, model = _running_embedder()
+    metadata = metadata or {}
+    return (metadata.get("embedding_backend", backend), metadata.get("embedding_model", model)) == (backend, model)
+
+def current_collection_name() -> str:
+    """
+    The collection this process reads and writes: the active one, as long as
+    it was built with this process's embedder. After a re-index to another
+    model, a running process keeps using its previous collection (its
+    vectors would not be comparable) until restarted with the new backend.
+    """
+    global _current_name
+    name = active_collection_name()
+    if name == _current_name:
+        return name
+    metadata = _open_collection(name).metadata or {}
+    if _embedder_matches(metadata):
+        if _current_name is not None:
+            print(f"Switching from collection {_current_name} to {name}")
+        _current_name = name
+        return name
+    built_with = f"{metadata.get('embedding_backend')}/{metadata.get('embedding_model')}"
+    running = "/".join(_running_embedder())
+    if _current_name is None:
+        raise RuntimeError(f"Active collection {name} was built with {built_with} but this process embeds with {running}; "
+                           f"start it with EMBEDDING_BACKEND={metadata.get('embedding_backend')}")
+    if name not in _mismatched_names:
+        _mismatched_names.add(name)
+        print(f"Active collection {name} was built with {built_with} but this process embeds with {running}; "
+              f"it keeps using {_current_name} until restarted with EMBEDDING_BACKEND={metadata.get('embedding_backend')}")
+    return _current_name
+
+def get_collection(name: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None):
+    """The named collection, or this process's current one (see `current_collection_name`)."""
+    return _open_collection(name or current_collection_name(), metadata)
+
+def _open_collection(name: str, metadata: Optional[Dict[str, Any]] = None):
+    """Cached handle to a collection, created with the current HNSW settings if missing."""
+    col = _collections.get(name)
+    if col is not None:
+        return col
+
     client = get_chroma_client()
     # Always use get_or_create_collection to ensure it exists
-    col = client.get_or_create_collection(name=name)
+    col = client.get_or_create_collection(name=name, configuration={"hnsw": hnsw_configuration()}, metadata=metadata)
+    hnsw = (col.configuration or {}).get("hnsw") or {}
+    built = (hnsw.get("space"), hnsw.get("max_neighbors"), hnsw.get("ef_construction"))
+    if built != (CHROMA_SPACE, CHROMA_HNSW_M, CHROMA_CONSTRUCTION_EF):
+        print(f"Collection {name} was built with space/M/construction_ef={built}; "
+              f"run compact_vector_store.py to rebuild with {(CHROMA_SPACE, CHROMA_HNSW_M, CHROMA_CONSTRUCTION_EF)}")
+    if hnsw.get("ef_search") != CHROMA_SEARCH_EF:
+        col.modify(configuration={"hnsw": {"ef_search": CHROMA_SEARCH_EF}})
+    _collections[name] = col
     return col
 
+def collection_space(collection) -> str:
+    """Distance space the collection was built with (may differ from CHROMA_SPACE)."""
+    return ((collection.configuration or {}).get("hnsw") or {}).get("space") or "l2"
+
+def similarity_to_distance(similarity: float, space: str) -> float:
+    """
+    Chroma distance equivalent to a cosine similarity for unit vectors:
+    l2 is squared L2 (2 - 2cos), cosine is 1 - cos, ip is 1 - dot.
+    """
+    if space == "l2":
+        return 2 * (1 - similarity)
+    return 1 - similarity
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """Inverse of `similarity_to_distance`, to compare results across spaces and tiers."""
+    if space == "l2":
+        return 1 - distance / 2
+    return 1 - distance
+
+def compact_collection(name: Optional[str] = None, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Rebuilds a collection from its own vectors and metadata: drops stored
+    documents (unless CHROMA_STORE_DOCUMENTS), applies the current HNSW
+    settings, discards deleted-element garbage in the index, then vacuums
+    Chroma's SQLite file. Stop ingestion while this runs.
+    """
+    def _disk_usage() -> int:
+        return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(CHROMA_DB_PATH) for f in files)
+
+    client = get_chroma_client()
+    name = name or active_collection_name()
+    size_before = _disk_usage()
+    source = get_collection(name)
+    staging_name = f"{name}-compact"
+    if staging_name in [c.name for c in client.list_collections()]:
+        client.delete_collection(staging_name)
+    staging = client.create_collection(name=staging_name, configuration={"hnsw": hnsw_configuration()}, metadata=source.metadata)
+
+    include = ["embeddings", "metadatas"] + (["documents"] if CHROMA_STORE_DOCUMENTS else [])
+    copied = 0
+    offset = 0
+    while True:
+        page = source.get(include=include, limit=batch_size, offset=offset)
+        if not page['ids']:
+            break
+        offset += len(page['ids'])
+        staging.add(
+            ids=page['ids'],
+            embeddings=page['embeddings'],
+            metadatas=page['metadatas'],
+            documents=page['documents'] if CHROMA_STORE_DOCUMENTS else None
+        )
+        copied += len(page['ids'])
+
+    if staging.count() != source.count():
+        client.delete_collection(staging_name)
+        raise RuntimeError(f"Compaction copied {staging.count()} of {source.count()} vectors; original kept")
+
+    client.delete_collection(name)
+    staging.modify(name=name)
+    _collections.pop(name, None)
+
+    conn = sqlite3.connect(os.path.join(CHROMA_DB_PATH, "chroma.sqlite3"))
+    try:
+        conn.execute("VACUUM")
+        live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+    finally:
+        conn.close()
+    # Chroma leaves the dropped collection's HNSW files behind
+    for entry in os.listdir(CHROMA_DB_PATH):
+        path = os.path.join(CHROMA_DB_PATH, entry)
+        if os.path.isdir(path) and entry not in live_segments:
+            shutil.rmtree(path)
+
+    size_after = _disk_usage()
+    print(f"Compacted {name}: {copied} vectors, {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    return {"vectors": copied, "bytes_before": size_before, "bytes_after": size_after}
+
+def to_epoch(value) -> int:
+    """Converts a stored published_at (datetime or SQLite timestamp string) to epoch seconds."""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+def backfill_chroma_published_at(batch_size: int = 500) -> int:
+    """
+    Adds the epoch `published_at` metadata field to vectors stored before it
+    existed, reading the timestamp from SQLite. Returns the number updated.
+    """
+    collection = get_collection()
+    updated = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        ids = page['ids']
+        if not ids:
+            break
+        offset += len(ids)
+
+        missing = {aid: meta or {} for aid, meta in zip(ids, page['metadatas']) if not meta or 'published_at' not in meta}
+        if not missing:
+            continue
+
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        placeholders = ','.join('?' for _ in missing)
+        cursor.execute(f"SELECT id, published_at FROM articles WHERE id IN ({placeholders})", list(missing))
+        published = {row[0]: row[1] for row in cursor.fetchall()}
+        conn.close()
+
+        update_ids, update_metadatas = [], []
+        for aid, meta in missing.items():
+            if published.get(aid):
+                update_ids.append(aid)
+                update_metadatas.append({**meta, "published_at": to_epoch(published[aid])})
+        if update_ids:
+            collection.update(ids=update_ids, metadatas=update_metadatas)
+            updated += len(update_ids)
+    print(f"Backfilled published_at for {updated} vectors")
+    return updated
+
 def init_db():
     init_sqlite()
     # Initialize ChromaDB collection
     get_collection()
+    load_known_ids()
     print("Databases initialized.")
 
-# Helper to save article to SQLite
-def save_article_to_sqlite(article: Dict[str, Any]):
+# In-memory index of stored article ids, so the ingestion path can skip
+# already-seen URLs without opening a connection per check.
+_known_ids = None
+_known_ids_lock = threading.Lock()
+
+def load_known_ids():
+    """(Re)builds the known-id index from the articles table."""
+    global _known_ids
     conn = get_sqlite_conn()
     cursor = conn.cursor()
-    
+    cursor.execute("SELECT id FROM articles")
+    ids = {row[0] for row in cursor.fetchall()}
+    conn.close()
+    with _known_ids_lock:
+        _known_ids = ids
+    print(f"Loaded {len(ids)} known article ids")
+
+def is_known_article(article_id: str) -> bool:
+    if _known_ids is None:
+        load_known_ids()
+    return article_id in _known_ids
+
+def mark_article_known(article_id: str):
+    if _known_ids is None:
+        load_known_ids()
+    with _known_ids_lock:
+        _known_ids.add(article_id)
+
+# Helpers to save articles to SQLite
+ARTICLE_UPSERT_SQL = '''
+INSERT OR REPLACE INTO articles (id, title, content, source, published_at, url, is_duplicate, duplicate_of_id, entities_json, impacted_stocks_json, sector)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def _article_row(article: Dict[str, Any]) -> tuple:
     entities_json = json.dumps(article.get('entities', []))
     impacted_stocks_json = json.dumps(article.get('impacted_stocks', []))
-    
-    cursor.execute('''
-    INSERT OR REPLACE INTO articles (id, title, content, source, published_at, url, is_duplicate, duplicate_of_id, entities_json, impacted_stocks_json, sector)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    return (
         article['id'],
         article['title'],
         article['content'],
@@ -112,11 +568,260 @@ def save_article_to_sqlite(article: Dict[str, Any]):
         entities_json,
         impacted_stocks_json,
         article.get('sector', 'General')
-    ))
-    
-    conn.commit()
+    )
+
+def save_article_to_sqlite(article: Dict[str, Any]):
+    save_articles_to_sqlite([article])
+
+def save_articles_to_sqlite(articles: List[Dict[str, Any]]):
+    """
+    Writes a batch of articles with one executemany in a single transaction,
+    so a whole batch costs one commit instead of one per row.
+    """
+    if not articles:
+        return
+    conn = get_sqlite_conn()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            # Counters are adjusted from the old rows so re-stores don't double count
+            _apply_stats_delta(cursor, articles)
+            cursor.executemany(ARTICLE_UPSERT_SQL, [_article_row(a) for a in articles])
+            for article in articles:
+                _write_normalized_rows(cursor, article)
+    finally:
+        conn.close()
+    for article in articles:
+        mark_article_known(article['id'])
+
+# Stats helpers
+STATS_TOTAL = "total"
+STATS_DUPLICATES = "duplicates"
+STATS_SECTOR_PREFIX = "sector:"
+STATS_SOURCE_PREFIX = "source:"
+THROUGHPUT_RETENTION_MINUTES = 24 * 60
+
+def _stats_keys(is_duplicate, sector, source) -> List[str]:
+    keys = [STATS_TOTAL, f"{STATS_SECTOR_PREFIX}{sector or 'General'}", f"{STATS_SOURCE_PREFIX}{source or 'Unknown Source'}"]
+    if is_duplicate:
+        keys.append(STATS_DUPLICATES)
+    return keys
+
+def _apply_stats_delta(cursor: sqlite3.Cursor, articles: List[Dict[str, Any]]):
+    """Updates the stats counters for a batch about to be upserted."""
+    from collections import Counter
+    import time
+    delta = Counter()
+
+    ids = [a['id'] for a in articles]
+    existing = []
+    # Chunked to stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ','.join('?' for _ in chunk)
+        cursor.execute(f"SELECT is_duplicate, sector, source FROM articles WHERE id IN ({placeholders})", chunk)
+        existing.extend(cursor.fetchall())
+    for row in existing:
+        for key in _stats_keys(row[0], row[1], row[2]):
+            delta[key] -= 1
+
+    for article in articles:
+        for key in _stats_keys(article.get('is_duplicate', False), article.get('sector', 'General'), article['source']):
+            delta[key] += 1
+
+    cursor.executemany(
+        "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+        [(key, value) for key, value in delta.items() if value]
+    )
+
+    minute = int(time.time() // 60)
+    cursor.execute(
+        "INSERT INTO ingest_throughput (minute, count) VALUES (?, ?) ON CONFLICT(minute) DO UPDATE SET count = count + excluded.count",
+        (minute, len(articles))
+    )
+    cursor.execute("DELETE FROM ingest_throughput WHERE minute < ?", (minute - THROUGHPUT_RETENTION_MINUTES,))
+
+def _rebuild_stats(cursor: sqlite3.Cursor):
+    cursor.execute("DELETE FROM stats")
+    cursor.execute('''
+    INSERT INTO stats (key, value)
+    SELECT ?, COUNT(*) FROM articles
+    UNION ALL SELECT ?, COUNT(*) FROM articles WHERE is_duplicate = 1
+    UNION ALL SELECT ? || COALESCE(sector, 'General'), COUNT(*) FROM articles GROUP BY COALESCE(sector, 'General')
+    UNION ALL SELECT ? || COALESCE(source, 'Unknown Source'), COUNT(*) FROM articles GROUP BY COALESCE(source, 'Unknown Source')
+    ''', (STATS_TOTAL, STATS_DUPLICATES, STATS_SECTOR_PREFIX, STATS_SOURCE_PREFIX))
+
+def rebuild_stats(check_only: bool = False) -> Dict[str, Any]:
+    """
+    Recomputes the stats counters from the articles table.
+    Returns the keys whose stored value drifted; with `check_only` nothing is written.
+    """
+    conn = get_sqlite_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, value FROM stats")
+        before = {row[0]: row[1] for row in cursor.fetchall()}
+        with conn:
+            _rebuild_stats(cursor)
+            cursor.execute("SELECT key, value FROM stats")
+            after = {row[0]: row[1] for row in cursor.fetchall()}
+            if check_only:
+                conn.rollback()
+    finally:
+        conn.close()
+
+    drift = {}
+    for key in set(before) | set(after):
+        if before.get(key, 0) != after.get(key, 0):
+            drift[key] = {"stored": before.get(key, 0), "actual": after.get(key, 0)}
+    return drift
+
+def get_stats_snapshot(throughput_minutes: int = 15) -> Dict[str, Any]:
+    """Reads the precomputed counters; cost depends on the number of sectors/sources, not articles."""
+    import time
+    conn = get_sqlite_conn()
+    cursor = conn.cursor()
+    cursor.execute("SELECT key, value FROM stats")
+    counters = {row[0]: row[1] for row in cursor.fetchall()}
+    minute = int(time.time() // 60)
+    cursor.execute("SELECT COALESCE(SUM(count), 0) FROM ingest_throughput WHERE minute > ?", (minute - throughput_minutes,))
+    recent = cursor.fetchone()[0]
     conn.close()
 
+    return {
+        "total": counters.get(STATS_TOTAL, 0),
+        "duplicates": counters.get(STATS_DUPLICATES, 0),
+        "by_sector": {k[len(STATS_SECTOR_PREFIX):]: v for k, v in counters.items() if k.startswith(STATS_SECTOR_PREFIX) and v},
+        "by_source": {k[len(STATS_SOURCE_PREFIX):]: v for k, v in counters.items() if k.startswith(STATS_SOURCE_PREFIX) and v},
+        "ingested_last_minutes": throughput_minutes,
+        "ingested_recent": recent,
+        "ingest_rate_per_minute": recent / throughput_minutes if throughput_minutes else 0.0,
+    }
+
+def _write_normalized_rows(cursor: sqlite3.Cursor, article: Dict[str, Any]):
+    """Replaces the article_entities / article_impacts rows for one article."""
+    article_id = article['id']
+    cursor.execute("DELETE FROM article_entities WHERE article_id = ?", (article_id,))
+    cursor.execute("DELETE FROM article_impacts WHERE article_id = ?", (article_id,))
+    cursor.executemany(
+        "INSERT INTO article_entities (article_id, name, type) VALUES (?, ?, ?)",
+        [(article_id, e.get('name'), e.get('type')) for e in article.get('entities', [])]
+    )
+    cursor.executemany(
+        '''
+        INSERT INTO article_impacts (article_id, symbol, type, sentiment, impact_score, confidence, reasoning, sector, published_at, is_duplicate)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''',
+        [(
+            article_id,
+            str(s.get('symbol', '')).upper(),
+            s.get('type'),
+            s.get('sentiment'),
+            s.get('impact_score'),
+            s.get('confidence'),
+            s.get('reasoning'),
+            article.get('sector', 'General'),
+            article['published_at'],
+            article.get('is_duplicate', False)
+        ) for s in article.get('impacted_stocks', []) if s.get('symbol')]
+    )
+
+    cursor.execute("DELETE FROM articles_fts WHERE article_id = ?", (article_id,))
+    if not article.get('is_duplicate', False):
+        tickers = " ".join(str(s.get('symbol', '')).upper() for s in article.get('impacted_stocks', []) if s.get('symbol'))
+        cursor.execute(
+            "INSERT INTO articles_fts (article_id, title, content, tickers) VALUES (?, ?, ?, ?)",
+            (article_id, article.get('title', ''), article.get('content', ''), tickers)
+        )
+
+def _fts_match_expression(terms: List[str]) -> str:
+    """Builds an FTS5 MATCH expression that ORs each term as a quoted phrase."""
+    import re
+    phrases = []
+    for term in terms:
+        words = re.findall(r"\w+", term or "")
+        if words:
+            phrase = '"' + " ".join(words) + '"'
+            if phrase not in phrases:
+                phrases.append(phrase)
+    return " OR ".join(phrases)
+
+def search_articles_fts(terms: List[str], limit: int = 20, sector: str = None, since: datetime = None, until: datetime = None) -> List[str]:
+    """
+    BM25 keyword search over title/content/tickers, optionally restricted
+    to a sector and a published_at window. Returns article ids, best match first.
+    """
+    expression = _fts_match_expression(terms)
+    if not expression:
+        return []
+
+    sql = '''
+    SELECT f.article_id FROM articles_fts f
+    {join}
+    WHERE articles_fts MATCH ? {filters}
+    ORDER BY bm25(articles_fts, 0.0, 2.0, 1.0, 3.0)
+    LIMIT ?
+    '''
+    params: List[Any] = [expression]
+    filters = []
+    if sector:
+        filters.append("AND a.sector = ?")
+        params.append(sector)
+    if since is not None:
+        filters.append("AND a.published_at >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("AND a.published_at <= ?")
+        params.append(until)
+    join = "JOIN articles a ON a.id = f.article_id" if filters else ""
+    params.append(limit)
+
+    conn = get_sqlite_conn()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.format(join=join, filters=" ".join(filters)), params)
+        ids = [row[0] for row in cursor.fetchall()]
+    except sqlite3.OperationalError as e:
+        print(f"Keyword search error: {e}")
+        ids = []
+    conn.close()
+    return ids
+
+def get_articles_for_symbol(symbol: str, since: datetime = None, limit: int = 20, offset: int = 0, include_duplicates: bool = False) -> List[Dict[str, Any]]:
+    """
+    Articles impacting `symbol`, newest first, answered from the
+    (symbol, published_at) index on article_impacts.
+    """
+    where = ["i.symbol = ?"]
+    params: List[Any] = [symbol.upper()]
+    if since is not None:
+        where.append("i.published_at >= ?")
+        params.append(since)
+    if not include_duplicates:
+        where.append("i.is_duplicate = 0")
+
+    conn = get_sqlite_conn()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+    SELECT a.*, i.sentiment AS impact_sentiment, i.impact_score, i.confidence AS impact_confidence, i.reasoning AS impact_reasoning
+    FROM article_impacts i JOIN articles a ON a.id = i.article_id
+    WHERE {" AND ".join(where)}
+    ORDER BY i.published_at DESC
+    LIMIT ? OFFSET ?
+    ''', params + [limit, offset])
+    rows = cursor.fetchall()
+    conn.close()
+
+    articles = []
+    for row in rows:
+        article = dict(row)
+        if article.get('entities_json'):
+            article['entities'] = json.loads(article['entities_json'])
+        if article.get('impacted_stocks_json'):
+            article['impacted_stocks'] = json.loads(article['impacted_stocks_json'])
+        articles.append(article)
+    return articles
+
 def get_article_from_sqlite(article_id: str) -> Dict[str, Any]:
     conn = get_sqlite_conn()
     cursor = conn.cursor()
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Sequence
+import numpy as np
+
+# Backend selection; see `create_embedder`
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) # 0 = library default
+# ONNX weights inside the model repo; the *_qint8_* variants are int8-quantized
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx2.onnx")
+EMBEDDING_BATCH_SIZE = 32
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+class Embedder:
+    """
+    Common interface for embedding backends.
+    `encode_batch` returns an (n, dim) float32 matrix of L2-normalized rows,
+    so Chroma's L2 distances and cosine similarities are interchangeable.
+    """
+
+    name = "embedder"
+    dim: int = 0
+
+    def encode_batch(self, texts: Sequence[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        raise NotImplementedError
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode_batch([text])[0]
+
+class SentenceTransformerEmbedder(Embedder):
+    """The full-precision PyTorch model via sentence-transformers."""
+
+    def __init__(self, model_name: str, threads: int = EMBEDDING_THREADS, **model_kwargs):
+        # Imported here so importing the app does not pull in torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu", **model_kwargs)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode_batch(self, texts: Sequence[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize(self.model.encode(list(texts), batch_size=batch_size))
+
+class OnnxEmbedder(SentenceTransformerEmbedder):
+    """
+    Same model run through ONNX Runtime on the CPU, by default with the
+    int8-quantized weights shipped in the model repo. `threads` sets the
+    intra-op thread count of the inference session.
+    """
+
+    def __init__(self, model_name: str, threads: int = EMBEDDING_THREADS, file_name: str = EMBEDDING_ONNX_FILE):
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+        super().__init__(
+            model_name,
+            threads=0,
+            backend="onnx",
+            model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider", "session_options": session_options},
+        )
+        self.name = f"{model_name}:onnx:{file_name}"
+
+class Int8Embedder(SentenceTransformerEmbedder):
+    """PyTorch model with its Linear layers dynamically quantized to int8."""
+
+    def __init__(self, model_name: str, threads: int = EMBEDDING_THREADS):
+        super().__init__(model_name, threads=threads)
+        import torch
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.name = f"{model_name}:int8"
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic, dependency-free embedder for tests and benchmarks: hashes
+    word unigrams and bigrams into a fixed-size signed vector. Near-identical
+    texts land close together, but it has no semantic understanding.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def encode_batch(self, texts: Sequence[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize(np.stack([self._embed(t) for t in texts]))
+
+def _hashing_embedder(model_name: str, threads: int = 0, dim: int = 384) -> HashingEmbedder:
+    return HashingEmbedder(dim)
+
+BACKENDS = {
+    "sentence-transformers": SentenceTransformerEmbedder,
+    "onnx": OnnxEmbedder,
+    "int8": Int8Embedder,
+    "hashing": _hashing_embedder,
+}
+
+def create_embedder(backend: str = None, model_name: str = "all-MiniLM-L6-v2", **kwargs) -> Embedder:
+    """Builds the embedder for `backend` (default: the EMBEDDING_BACKEND setting)."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](model_name, **kwargs)
+
+def duplicate_decisions(vectors: np.ndarray, threshold: float) -> List[int]:
+    """
+    Replays ingestion order: article i is a duplicate of the most similar
+    earlier article if their cosine similarity reaches `threshold`.
+    Returns that earlier index, or -1 for unique articles.
+    """
+    vectors = _normalize(vectors)
+    similarities = vectors @ vectors.T
+    decisions = []
+    for i in range(len(vectors)):
+        if i == 0:
+            decisions.append(-1)
+            continue
+        j = int(similarities[i, :i].argmax())
+        decisions.append(j if similarities[i, j] >= threshold else -1)
+    return decisions
+
+def parity_report(texts: Sequence[str], reference: Embedder, candidate: Embedder, threshold: float) -> Dict[str, float]:
+    """
+    Compares duplicate decisions of two backends over the same texts.
+    `flipped_*` count articles whose duplicate/unique verdict changed;
+    `relinked` counts duplicates pointed at a different original.
+    """
+    timings = {}
+    vectors = {}
+    for label, embedder in (("reference", reference), ("candidate", candidate)):
+        start = time.perf_counter()
+        vectors[label] = embedder.encode_batch(texts)
+        elapsed = time.perf_counter() - start
+        timings[f"{label}_texts_per_s"] = len(texts) / elapsed if elapsed else 0.0
+
+    ref = duplicate_decisions(vectors["reference"], threshold)
+    cand = duplicate_decisions(vectors["candidate"], threshold)
+    to_duplicate = sum(1 for r, c in zip(ref, cand) if r == -1 and c != -1)
+    to_unique = sum(1 for r, c in zip(ref, cand) if r != -1 and c == -1)
+    relinked = sum(1 for r, c in zip(ref, cand) if r != -1 and c != -1 and r != c)
+    changed = to_duplicate + to_unique + relinked
+    report = {
+        "articles": len(texts),
+        "reference": reference.name,
+        "candidate": candidate.name,
+        "threshold": threshold,
+        "reference_duplicates": sum(1 for r in ref if r != -1),
+        "candidate_duplicates": sum(1 for c in cand if c != -1),
+        "flipped_to_duplicate": to_duplicate,
+        "flipped_to_unique": to_unique,
+        "relinked": relinked,
+        "agreement": 1 - changed / len(texts) if texts else 1.0,
+    }
+    if vectors["reference"].shape == vectors["candidate"].shape:
+        # Row-wise cosine between the two backends' vectors for the same text
+        report["mean_vector_cosine"] = float(np.mean(np.sum(vectors["reference"] * vectors["candidate"], axis=1)))
+    report.update(timings)
+    return report
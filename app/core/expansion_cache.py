@@ -0,0 +1,134 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from app.core.database import get_sqlite_conn
+from app.core.metrics import CACHE_LOOKUPS
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1024
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query or "").strip().lower()
+
+class ExpansionCache:
+    """
+    TTL + LRU cache for LLM query expansions, keyed by normalized query text.
+    Concurrent lookups for the same missing key are coalesced so only one
+    expansion runs; the other callers wait for its result.
+    With `persist=True` entries are also written to SQLite and survive restarts.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES, persist: bool = False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict() # key -> (expires_at, value)
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict[str, Any], expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_persisted(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        cursor.execute("SELECT value_json, expires_at FROM query_expansion_cache WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        conn.close()
+        if not row or row["expires_at"] < time.time():
+            return None
+        value = json.loads(row["value_json"])
+        with self._lock:
+            self._set_local(key, value, row["expires_at"])
+        return value
+
+    def _store_persisted(self, key: str, value: Dict[str, Any], expires_at: float):
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO query_expansion_cache (key, value_json, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_or_compute(self, query: str, compute: Callable[[str], Dict[str, Any]], should_cache: Callable[[Dict[str, Any]], bool] = None) -> Dict[str, Any]:
+        """
+        Returns the cached expansion for `query`, or runs `compute(query)` once
+        and shares the result with any concurrent callers for the same key.
+        `should_cache` can reject results (e.g. LLM fallbacks) from being stored.
+        """
+        key = normalize_query(query)
+
+        with self._lock:
+            value = self._get_local(key)
+            if value is not None:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache="expansion", result="hit")
+                return value
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            with self._lock:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache="expansion", result="hit")
+            return future.result()
+
+        try:
+            value = self._load_persisted(key) if self.persist else None
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(cache="expansion", result="hit")
+            else:
+                with self._lock:
+                    self.misses += 1
+                    CACHE_LOOKUPS.inc(cache="expansion", result="miss")
+                value = compute(query)
+                if should_cache is None or should_cache(value):
+                    expires_at = time.time() + self.ttl
+                    with self._lock:
+                        self._set_local(key, value, expires_at)
+                    if self.persist:
+                        self._store_persisted(key, value, expires_at)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+from app.core.database import get_sqlite_conn
+from app.core.metrics import CACHE_LOOKUPS
+
+# Bump when the extraction prompt changes so stale results are not reused
+EXTRACTION_PROMPT_VERSION = "v1"
+DEFAULT_MAX_ENTRIES = 50000
+# Eviction runs every N writes rather than counting rows on each one
+EVICTION_CHECK_INTERVAL = 100
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+def make_cache_key(title: str, content: str, version_tag: str) -> str:
+    normalized = f"{normalize_text(title)}\n{normalize_text(content)}\n{version_tag}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+class ExtractionCache:
+    """
+    Persistent cache of LLM extraction results, keyed by a hash of the
+    normalized title/content plus the prompt and model version.
+    Stored in its own SQLite table and evicted least-recently-used
+    once it grows past `max_entries`.
+    """
+
+    def __init__(self, version_tag: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.version_tag = version_tag
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, title: str, content: str) -> str:
+        return make_cache_key(title, content, self.version_tag)
+
+    def get(self, title: str, content: str) -> Optional[Dict[str, Any]]:
+        key = self.key_for(title, content)
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        cursor.execute("SELECT sector, entities_json, impacted_stocks_json FROM extraction_cache WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("UPDATE extraction_cache SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+        conn.close()
+
+        with self._lock:
+            if row:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(cache="extraction", result="hit")
+            else:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(cache="extraction", result="miss")
+
+        if not row:
+            return None
+        return {
+            "sector": row["sector"],
+            "entities": json.loads(row["entities_json"] or "[]"),
+            "impacted_stocks": json.loads(row["impacted_stocks_json"] or "[]"),
+        }
+
+    def put(self, title: str, content: str, sector: str, entities: list, impacted_stocks: list):
+        key = self.key_for(title, content)
+        now = time.time()
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        cursor.execute('''
+        INSERT OR REPLACE INTO extraction_cache (key, sector, entities_json, impacted_stocks_json, created_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (key, sector, json.dumps(entities), json.dumps(impacted_stocks), now, now))
+
+        with self._lock:
+            self._writes += 1
+            check_eviction = self._writes % EVICTION_CHECK_INTERVAL == 1
+        if check_eviction:
+            self._evict(cursor)
+        conn.commit()
+        conn.close()
+
+    def _evict(self, cursor):
+        """Drops least-recently-used entries once the table exceeds its budget."""
+        cursor.execute("SELECT COUNT(*) FROM extraction_cache")
+        overflow = cursor.fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor.execute('''
+            DELETE FROM extraction_cache WHERE key IN (
+                SELECT key FROM extraction_cache ORDER BY last_used_at ASC LIMIT ?
+            )
+            ''', (overflow,))
+            print(f"Evicted {overflow} extraction cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
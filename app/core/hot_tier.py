@@ -0,0 +1,286 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.core.database import get_sqlite_conn
+
+# Hot tier settings
+HOT_TIER_ENABLED = os.getenv("HOT_TIER", "1") == "1"
+HOT_TIER_WINDOW_HOURS = float(os.getenv("HOT_TIER_WINDOW_HOURS", "72"))
+HOT_TIER_CAPACITY = int(os.getenv("HOT_TIER_CAPACITY", "50000"))
+HOT_TIER_AGE_OUT_INTERVAL = float(os.getenv("HOT_TIER_AGE_OUT_INTERVAL", "300"))
+# How often a tier picks up vectors added by other processes
+HOT_TIER_SYNC_INTERVAL = float(os.getenv("HOT_TIER_SYNC_INTERVAL", "2"))
+
+class HotVectorTier:
+    """
+    Read cache of recent embeddings in one preallocated, contiguous float32
+    matrix with exact cosine search. Every vector is also written to Chroma
+    by the caller, so `age_out` simply evicts rows older than the window (or
+    the oldest ones, when the matrix is full).
+    With `shared=True` additions are appended to the SQLite `hot_vectors`
+    log: `sync` pulls in what other processes added, and a restarted
+    process reloads the tier from it.
+    """
+
+    def __init__(self, dim: int, capacity: int = HOT_TIER_CAPACITY, window_hours: float = HOT_TIER_WINDOW_HOURS, tag: str = "", shared: bool = False):
+        self.dim = dim
+        # The collection the vectors belong to; log rows of other collections are ignored
+        self.tag = tag
+        self.capacity = capacity
+        self.window_seconds = window_hours * 3600
+        self.shared = shared
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._published = np.zeros(capacity, dtype=np.int64)
+        self._sectors = np.empty(capacity, dtype=object)
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        # Last log row applied, and when the log was last checked
+        self.synced_seq = 0
+        self.synced_at = 0.0
+        self._timer: Optional[threading.Thread] = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, article_id: str) -> bool:
+        return article_id in self._rows
+
+    # Writes
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, metadatas: Sequence[Dict[str, Any]], log: bool = True):
+        """
+        Inserts or replaces rows; makes room by evicting the oldest rows if
+        full. A shared tier also appends them to the log unless `log=False`.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        if self.shared and log:
+            self._append_log(ids, vectors, metadatas)
+        with self._lock:
+            new = len({aid for aid in ids if aid not in self._rows})
+            if len(self._ids) + new > self.capacity:
+                self.age_out(make_room=len(self._ids) + new - self.capacity)
+            for aid, vector, metadata in zip(ids, vectors, metadatas):
+                row = self._rows.get(aid)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(aid)
+                    self._metadatas.append(dict(metadata))
+                    self._rows[aid] = row
+                else:
+                    self._metadatas[row] = dict(metadata)
+                self._vectors[row] = vector
+                self._published[row] = metadata.get("published_at", 0)
+                self._sectors[row] = metadata.get("sector")
+        self._ensure_timer()
+
+    def age_out(self, now: Optional[float] = None, make_room: int = 0) -> int:
+        """
+        Evicts rows published before the window, plus the `make_room` oldest
+        remaining rows. They are already in Chroma. Returns the number evicted.
+        A shared tier also prunes log rows published before the window.
+        """
+        cutoff = (now if now is not None else time.time()) - self.window_seconds
+        if self.shared and not make_room:
+            self._prune_log(cutoff)
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return 0
+            drop = self._published[:n] < cutoff
+            extra = make_room - int(drop.sum())
+            if extra > 0:
+                # Oldest of the rows still kept
+                kept = np.flatnonzero(~drop)
+                oldest = kept[np.argsort(self._published[kept], kind="stable")[:extra]]
+                drop[oldest] = True
+            if not drop.any():
+                return 0
+
+            dropped = np.flatnonzero(drop)
+            keep = np.flatnonzero(~drop)
+            self._vectors[:len(keep)] = self._vectors[keep]
+            self._published[:len(keep)] = self._published[keep]
+            self._sectors[:len(keep)] = self._sectors[keep]
+            self._ids = [self._ids[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._rows = {aid: row for row, aid in enumerate(self._ids)}
+        print(f"Hot tier evicted {len(dropped)} vectors ({len(keep)} remain)")
+        return len(dropped)
+
+    # Shared log
+
+    def _append_log(self, ids: Sequence[str], vectors: np.ndarray, metadatas: Sequence[Dict[str, Any]]):
+        conn = get_sqlite_conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO hot_vectors (collection, article_id, published_at, metadata_json, vector) VALUES (?, ?, ?, ?, ?)",
+                [(self.tag, aid, int(metadata.get("published_at", 0)), json.dumps(metadata), vector.tobytes())
+                 for aid, vector, metadata in zip(ids, vectors, metadatas)]
+            )
+        conn.close()
+
+    def _prune_log(self, cutoff: float):
+        conn = get_sqlite_conn()
+        with conn:
+            conn.execute("DELETE FROM hot_vectors WHERE published_at < ?", (int(cutoff),))
+        conn.close()
+
+    def sync(self, batch_size: int = 5000) -> int:
+        """Applies log rows added (by any process) since the last sync. Returns the number applied."""
+        cutoff = int(time.time() - self.window_seconds)
+        applied = 0
+        conn = get_sqlite_conn()
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT seq, article_id, published_at, metadata_json, vector FROM hot_vectors "
+                    "WHERE collection = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (self.tag, self.synced_seq, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                self.synced_seq = rows[-1][0]
+                recent = [row for row in rows if row[2] >= cutoff and len(row[4]) == self.dim * 4]
+                if recent:
+                    self.add(
+                        [row[1] for row in recent],
+                        np.frombuffer(b"".join(row[4] for row in recent), dtype=np.float32).reshape(len(recent), self.dim),
+                        [json.loads(row[3]) for row in recent],
+                        log=False,
+                    )
+                    applied += len(recent)
+        finally:
+            conn.close()
+        self.synced_at = time.monotonic()
+        return applied
+
+    # Reads
+
+    def search(self, vectors: np.ndarray, k: int = 1, sector: Optional[str] = None, since: Optional[int] = None, until: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Exact top-`k` cosine search for each query row, optionally restricted
+        by sector and a published_at epoch range. Returns (id, similarity) lists.
+        """
+        queries = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            n = len(self._ids)
+            if n == 0:
+                return [[] for _ in range(len(queries))]
+            similarities = queries @ self._vectors[:n].T
+            mask = np.ones(n, dtype=bool)
+            if sector is not None:
+                mask &= self._sectors[:n] == sector
+            if since is not None:
+                mask &= self._published[:n] >= since
+            if until is not None:
+                mask &= self._published[:n] <= until
+            ids = self._ids
+
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [[] for _ in range(len(queries))]
+        similarities = similarities[:, candidates]
+        k = min(k, len(candidates))
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        results = []
+        for q in range(len(queries)):
+            order = top[q][np.argsort(-similarities[q, top[q]])]
+            results.append([(ids[candidates[col]], float(similarities[q, col])) for col in order])
+        return results
+
+    # Scheduling
+
+    def _ensure_timer(self):
+        if self._closed or (self._timer is not None and self._timer.is_alive()):
+            return
+        self._timer = threading.Thread(target=self._run_timer, name="hot-tier-age-out", daemon=True)
+        self._timer.start()
+
+    def close(self):
+        """Stops the age-out timer of a tier that is no longer used."""
+        self._closed = True
+
+    def _run_timer(self):
+        while True:
+            time.sleep(HOT_TIER_AGE_OUT_INTERVAL)
+            if self._closed:
+                return
+            try:
+                self.age_out()
+            except Exception as e:
+                print(f"Hot tier age-out error: {e}")
+
+def warm_from_chroma(tier: HotVectorTier, collection_name: Optional[str] = None, batch_size: int = 1000) -> int:
+    """Loads vectors published within the window from Chroma into an empty tier (and its log)."""
+    from app.core.database import get_collection
+    collection = get_collection(collection_name)
+    cutoff = int(time.time() - tier.window_seconds)
+    loaded = 0
+    offset = 0
+    while True:
+        page = collection.get(where={"published_at": {"$gte": cutoff}}, include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+        if not page['ids']:
+            break
+        offset += len(page['ids'])
+        if len(page['embeddings'][0]) != tier.dim:
+            print(f"Collection vectors have dim {len(page['embeddings'][0])}, hot tier expects {tier.dim}; not warming")
+            return 0
+        tier.add(page['ids'], np.asarray(page['embeddings'], dtype=np.float32), page['metadatas'])
+        loaded += len(page['ids'])
+    if loaded:
+        print(f"Warmed hot tier with {loaded} recent vectors from ChromaDB")
+    return loaded
+
+_hot_tier: Optional[HotVectorTier] = None
+_hot_tier_lock = threading.Lock()
+_sync_lock = threading.Lock()
+
+def _load_tier(dim: int, collection_name: str) -> HotVectorTier:
+    tier = HotVectorTier(dim, tag=collection_name, shared=True)
+    tier.age_out()
+    tier.sync()
+    if not len(tier):
+        # Nothing logged yet (first start or a fresh collection): seed the tier and the log from Chroma
+        warm_from_chroma(tier, collection_name)
+        tier.sync()
+    else:
+        print(f"Loaded {len(tier)} vectors into the hot tier for {collection_name}")
+    return tier
+
+def get_hot_tier(dim: int) -> Optional[HotVectorTier]:
+    """
+    The process-wide hot tier for the process's current collection, created
+    on first use, rebuilt when a re-index switches collections, and synced
+    with the shared log every HOT_TIER_SYNC_INTERVAL seconds; None when disabled.
+    """
+    global _hot_tier
+    if not HOT_TIER_ENABLED:
+        return None
+    from app.core.database import current_collection_name
+    collection_name = current_collection_name()
+    if _hot_tier is None or _hot_tier.tag != collection_name:
+        with _hot_tier_lock:
+            if _hot_tier is None or _hot_tier.tag != collection_name:
+                previous = _hot_tier
+                # Every vector was written through to its collection, so the old tier can just go
+                _hot_tier = _load_tier(dim, collection_name)
+                if previous is not None:
+                    previous.close()
+                    print(f"Hot tier switched from {previous.tag} to {collection_name}")
+    tier = _hot_tier
+    if time.monotonic() - tier.synced_at >= HOT_TIER_SYNC_INTERVAL and _sync_lock.acquire(blocking=False):
+        try:
+            tier.sync()
+        except Exception as e:
+            print(f"Hot tier sync error: {e}")
+        finally:
+            _sync_lock.release()
+    return tier
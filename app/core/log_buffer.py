@@ -0,0 +1,85 @@
+import atexit
+import queue
+import threading
+from datetime import datetime
+from typing import Dict
+
+LOG_FLUSH_INTERVAL = 1.0 # seconds between writes when the queue is quiet
+LOG_QUEUE_SIZE = 10000
+
+class BufferedLogWriter:
+    """
+    Appends lines to a log file from a background thread. `write` only puts
+    the line on a queue, so callers on the ingestion/extraction path never
+    block on disk; the writer keeps the file open and writes in batches.
+    If the queue is full the line is dropped rather than stalling the caller.
+    """
+
+    def __init__(self, path: str, flush_interval: float = LOG_FLUSH_INTERVAL, max_queue: int = LOG_QUEUE_SIZE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"log-{path}", daemon=True)
+        self._thread.start()
+
+    def write(self, message: str):
+        line = f"{datetime.now().isoformat(timespec='seconds')} {message.rstrip()}\n"
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Writes whatever is queued and stops the writer thread."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+
+    def _drain(self, f, first: str = None):
+        lines = [first] if first is not None else []
+        while True:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            f.writelines(lines)
+            f.flush()
+
+    def _run(self):
+        with open(self.path, "a") as f:
+            while not self._closed.is_set():
+                try:
+                    line = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                try:
+                    self._drain(f, line)
+                except Exception as e:
+                    print(f"Log write error ({self.path}): {e}")
+            self._drain(f)
+
+_writers: Dict[str, BufferedLogWriter] = {}
+_writers_lock = threading.Lock()
+
+def get_log_writer(path: str) -> BufferedLogWriter:
+    """Returns the shared writer for `path`, starting it on first use."""
+    writer = _writers.get(path)
+    if writer is not None:
+        return writer
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = BufferedLogWriter(path)
+    return writer
+
+def log_to_file(path: str, message: str):
+    get_log_writer(path).write(message)
+
+@atexit.register
+def close_all():
+    for writer in list(_writers.values()):
+        writer.close()
@@ -0,0 +1,159 @@
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(label_names: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(label_names):
+        raise ValueError(f"Expected labels {list(label_names)}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in label_names)
+
+def _format_labels(label_names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, **labels):
+        """Context manager that observes the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(self.label_names, labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+# Process-wide metrics, rendered in registration order by `render_prometheus`
+_registry: List[object] = []
+_registry_lock = threading.Lock()
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+def counter(name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, label_names))
+
+def histogram(name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, label_names, buckets))
+
+def render_prometheus() -> str:
+    """All registered metrics in the Prometheus text exposition format (0.0.4)."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Metrics shared across the app
+NODE_DURATION = histogram("workflow_node_duration_seconds", "Time spent in each LangGraph node.", ["workflow", "node"])
+NODE_ERRORS = counter("workflow_node_errors_total", "LangGraph node invocations that raised.", ["workflow", "node"])
+LLM_CALLS = counter("llm_calls_total", "Calls made to the LLM provider.", ["purpose", "outcome"])
+CACHE_LOOKUPS = counter("cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+DUPLICATES = counter("duplicates_total", "Articles marked as duplicates, by detection method.", ["method"])
+ERRORS = counter("errors_total", "Errors handled without failing the request, by component.", ["component"])
+HTTP_DURATION = histogram("http_request_duration_seconds", "HTTP request latency.", ["method", "route", "status"])
+
+def timed_node(workflow: str, node: str) -> Callable:
+    """Decorator recording duration and failures of a workflow node."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                NODE_ERRORS.inc(workflow=workflow, node=node)
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - start, workflow=workflow, node=node)
+        return wrapper
+    return decorator
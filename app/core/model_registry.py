@@ -0,0 +1,52 @@
+import threading
+from typing import Dict
+from app.core.embedders import EMBEDDING_BACKEND, Embedder, create_embedder
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Process-wide cache of loaded models, keyed by model name
+_models: Dict[str, Embedder] = {}
+_lock = threading.Lock()
+
+def get_embedding_model(name: str = DEFAULT_EMBEDDING_MODEL) -> Embedder:
+    """
+    Returns the shared embedder for `name`, built on first use with the
+    backend chosen by EMBEDDING_BACKEND (sentence-transformers, onnx, int8, hashing).
+    Safe to call from multiple threads; the model is only loaded once.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded it while we waited
+        model = _models.get(name)
+        if model is None:
+            print(f"Loading embedding model: {name} ({EMBEDDING_BACKEND} backend)")
+            model = create_embedder(EMBEDDING_BACKEND, name)
+            _models[name] = model
+    return model
+
+def register_model(name: str, model: Embedder):
+    """Installs an already-built model under `name` (e.g. a fake embedder for benchmarks)."""
+    with _lock:
+        _models[name] = model
+
+def warm_up(name: str = DEFAULT_EMBEDDING_MODEL, background: bool = True):
+    """
+    Preloads a model so the first request does not pay the load cost.
+    With `background=True` this returns immediately and loads in a daemon thread.
+    """
+    if not background:
+        get_embedding_model(name)
+        return None
+
+    def _load():
+        try:
+            get_embedding_model(name)
+        except Exception as e:
+            print(f"Model warm-up failed: {e}")
+
+    thread = threading.Thread(target=_load, name=f"warmup-{name}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+
+class TokenBucketRateLimiter:
+    """
+    Shared limiter for LLM calls: one bucket for requests per second and one
+    for tokens per minute. Callers reserve capacity up front and sleep off any
+    deficit, so concurrent callers are spaced out instead of bursting.
+    State is guarded by a thread lock so one limiter can be shared across
+    event loops and threads.
+    """
+
+    def __init__(self, requests_per_second: float, tokens_per_minute: float):
+        self.request_rate = requests_per_second
+        self.token_rate = tokens_per_minute / 60.0
+        # Allow a burst of up to one second of requests / one minute of tokens
+        self.request_capacity = max(1.0, requests_per_second)
+        self.token_capacity = tokens_per_minute
+        self._requests = self.request_capacity
+        self._tokens = self.token_capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Takes capacity for one request of `tokens` and returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._requests = min(self.request_capacity, self._requests + elapsed * self.request_rate)
+            self._tokens = min(self.token_capacity, self._tokens + elapsed * self.token_rate)
+
+            # Balances may go negative; the deficit is the caller's wait time
+            self._requests -= 1
+            self._tokens -= min(tokens, self.token_capacity)
+
+            wait = 0.0
+            if self._requests < 0:
+                wait = max(wait, -self._requests / self.request_rate)
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.token_rate)
+            return wait
+
+    async def acquire(self, tokens: int = 1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, tokens: int = 1):
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,206 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from app.core.database import (
+    ACTIVE_COLLECTION_REFRESH, CHROMA_STORE_DOCUMENTS, DEFAULT_COLLECTION, active_collection_name, get_chroma_client,
+    get_collection, get_setting, get_sqlite_conn, set_active_collection, set_setting,
+)
+from app.core.embedders import EMBEDDING_BACKEND, create_embedder
+
+REINDEX_CHECKPOINT_KEY = "reindex_checkpoint"
+REINDEX_CHUNK_SIZE = 512
+# Chunks queued per worker, so reading SQLite stays just ahead of embedding
+REINDEX_CHUNKS_PER_WORKER = 2
+
+# Per-process embedder for pool workers
+_worker_embedder = None
+
+def _init_worker(backend: str, model_name: str, threads: int):
+    global _worker_embedder
+    _worker_embedder = create_embedder(backend, model_name, threads=threads)
+
+def _embed_chunk(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.encode_batch(texts)
+
+def _stream_chunks(after_rowid: int, chunk_size: int) -> Iterator[List[Any]]:
+    """Unique articles in rowid order, `chunk_size` at a time, starting after `after_rowid`."""
+    conn = get_sqlite_conn()
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, id, title, content, source, sector, published_at FROM articles "
+            "WHERE is_duplicate = 0 AND rowid > ? ORDER BY rowid LIMIT ?",
+            (after_rowid, chunk_size)
+        ).fetchall()
+        if not rows:
+            return
+        after_rowid = rows[-1]['rowid']
+        yield rows
+
+def _row_metadata(row) -> Dict[str, Any]:
+    from app.agents.deduplication import chroma_metadata
+    return chroma_metadata(SimpleNamespace(
+        title=row['title'],
+        source=row['source'],
+        sector=row['sector'] or "General",
+        published_at=datetime.fromisoformat(str(row['published_at'])),
+    ))
+
+def load_checkpoint() -> Optional[Dict[str, Any]]:
+    value = get_setting(REINDEX_CHECKPOINT_KEY)
+    return json.loads(value) if value else None
+
+def _save_checkpoint(checkpoint: Dict[str, Any]):
+    set_setting(REINDEX_CHECKPOINT_KEY, json.dumps(checkpoint))
+
+def reindex(
+    backend: Optional[str] = None,
+    model_name: str = "all-MiniLM-L6-v2",
+    workers: int = 1,
+    chunk_size: int = REINDEX_CHUNK_SIZE,
+    target: Optional[str] = None,
+    restart: bool = False,
+    switch: bool = True,
+    drop_old: bool = False,
+) -> Dict[str, Any]:
+    """
+    Rebuilds the vector store from SQLite into a fresh collection and then
+    makes it the active one.
+
+    Unique articles are streamed in rowid order and embedded in chunks by
+    `workers` processes (0 embeds in this process). Each chunk is upserted
+    in order and the last rowid is checkpointed in SQLite, so an interrupted
+    run resumes where it stopped. Articles saved while the job runs get
+    new rowids and are picked up by catch-up passes before the switch, and
+    once more after running processes have noticed it.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    client = get_chroma_client()
+    checkpoint = load_checkpoint()
+    if checkpoint and restart:
+        if checkpoint['target'] in [c.name for c in client.list_collections()]:
+            client.delete_collection(checkpoint['target'])
+        checkpoint = None
+    if checkpoint:
+        if (checkpoint['backend'], checkpoint['model']) != (backend, model_name):
+            raise ValueError(
+                f"A re-index into {checkpoint['target']} with {checkpoint['backend']}/{checkpoint['model']} is in progress; "
+                "resume it with the same backend or pass --restart"
+            )
+        print(f"Resuming re-index into {checkpoint['target']} after rowid {checkpoint['last_rowid']} ({checkpoint['rows']} rows done)")
+    else:
+        checkpoint = {
+            "target": target or f"{DEFAULT_COLLECTION}-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "backend": backend,
+            "model": model_name,
+            "last_rowid": 0,
+            "rows": 0,
+        }
+        _save_checkpoint(checkpoint)
+        print(f"Re-indexing into new collection {checkpoint['target']} with {backend}/{model_name}")
+
+    collection = get_collection(checkpoint['target'], metadata={"embedding_backend": backend, "embedding_model": model_name})
+    max_batch = client.get_max_batch_size()
+    remaining = get_sqlite_conn().execute(
+        "SELECT COUNT(*) FROM articles WHERE is_duplicate = 0 AND rowid > ?", (checkpoint['last_rowid'],)
+    ).fetchone()[0]
+
+    if workers > 0:
+        # Split the cores between workers so their math libraries don't oversubscribe
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, model_name, threads),
+        )
+        embed = lambda texts: pool.submit(_embed_chunk, texts)
+        max_in_flight = workers * REINDEX_CHUNKS_PER_WORKER
+    else:
+        pool = None
+        local_embedder = create_embedder(backend, model_name)
+        embed = lambda texts: SimpleNamespace(result=lambda: local_embedder.encode_batch(texts))
+        max_in_flight = 1
+
+    start = time.perf_counter()
+    done = 0
+
+    def _write(rows, future):
+        nonlocal done
+        vectors = np.asarray(future.result(), dtype=np.float32)
+        for lo in range(0, len(rows), max_batch):
+            batch = rows[lo:lo + max_batch]
+            # upsert rather than add: a chunk written just before an interruption is replayed on resume
+            collection.upsert(
+                ids=[row['id'] for row in batch],
+                embeddings=vectors[lo:lo + max_batch].tolist(),
+                metadatas=[_row_metadata(row) for row in batch],
+                documents=[f"{row['title']} {row['content']}" for row in batch] if CHROMA_STORE_DOCUMENTS else None,
+            )
+        checkpoint['last_rowid'] = rows[-1]['rowid']
+        checkpoint['rows'] += len(rows)
+        _save_checkpoint(checkpoint)
+        done += len(rows)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0.0
+        eta = (remaining - done) / rate if rate and remaining > done else 0.0
+        print(f"Re-indexed {done}/{remaining} rows ({rate:.1f} rows/s, ETA {eta:.0f}s)")
+
+    def _catch_up():
+        nonlocal remaining
+        while True:
+            pending = deque()
+            passed = 0
+            for rows in _stream_chunks(checkpoint['last_rowid'], chunk_size):
+                pending.append((rows, embed([f"{row['title']} {row['content']}" for row in rows])))
+                passed += len(rows)
+                while len(pending) >= max_in_flight:
+                    _write(*pending.popleft())
+            while pending:
+                _write(*pending.popleft())
+            # Catch-up: keep going until a pass finds nothing saved since the last one
+            if not passed:
+                break
+            remaining = done + get_sqlite_conn().execute(
+                "SELECT COUNT(*) FROM articles WHERE is_duplicate = 0 AND rowid > ?", (checkpoint['last_rowid'],)
+            ).fetchone()[0]
+
+    previous = active_collection_name()
+    try:
+        _catch_up()
+        print(f"Re-index complete: {checkpoint['rows']} vectors in {checkpoint['target']}")
+        if switch:
+            set_active_collection(checkpoint['target'])
+            print(f"Active collection switched from {previous} to {checkpoint['target']}")
+            # Running processes notice the switch within ACTIVE_COLLECTION_REFRESH seconds and
+            # write to the previous collection until then; re-index what they stored meanwhile
+            time.sleep(ACTIVE_COLLECTION_REFRESH + 1)
+            _catch_up()
+            set_setting(REINDEX_CHECKPOINT_KEY, None)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "target": checkpoint['target'],
+        "rows": done,
+        "total_rows": checkpoint['rows'],
+        "seconds": elapsed,
+        "rows_per_s": done / elapsed if elapsed else 0.0,
+        "previous": previous,
+        "switched": switch,
+    }
+    print(f"{checkpoint['rows']} vectors in {checkpoint['target']} ({summary['rows_per_s']:.1f} rows/s this run)")
+
+    if switch and drop_old and previous != checkpoint['target']:
+        if previous in [c.name for c in client.list_collections()]:
+            client.delete_collection(previous)
+            print(f"Dropped previous collection {previous}")
+    return summary
@@ -0,0 +1,127 @@
+import hashlib
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.database import get_sqlite_conn
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3 # words per shingle
+DEFAULT_MAX_DISTANCE = 5
+# max_distance + 1 bands: two signatures within max_distance bits must agree on
+# at least one band (pigeonhole), so only those buckets need to be checked
+BAND_WIDTHS = [11, 11, 11, 11, 10, 10]
+# Too few shingles make signatures unreliable; such texts go to the semantic check
+MIN_SHINGLES = 8
+
+def _shingles(text: str) -> List[str]:
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+def simhash(text: str) -> Tuple[int, int]:
+    """Returns (64-bit SimHash, number of shingles) for `text`."""
+    shingles = _shingles(text)
+    if not shingles:
+        return 0, 0
+    digests = b"".join(hashlib.blake2b(s.encode(), digest_size=8).digest() for s in shingles)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8), axis=1)
+    # Each bit of the signature is set when most shingles have it set
+    votes = bits.sum(axis=0, dtype=np.int32) * 2 - len(shingles)
+    signature = int.from_bytes(np.packbits(votes > 0).tobytes(), "big")
+    return signature, len(shingles)
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+def _bands(signature: int) -> List[int]:
+    bands = []
+    shift = 0
+    for width in BAND_WIDTHS:
+        bands.append((signature >> shift) & ((1 << width) - 1))
+        shift += width
+    return bands
+
+class SimHashIndex:
+    """
+    Lexical near-duplicate index. Signatures are persisted in SQLite and
+    held in memory as band tables, so a lookup is a few dict probes plus a
+    popcount per candidate.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        if max_distance >= len(BAND_WIDTHS):
+            raise ValueError(f"max_distance must be below {len(BAND_WIDTHS)} for {len(BAND_WIDTHS)} bands")
+        self.max_distance = max_distance
+        self._signatures: Dict[str, int] = {}
+        self._bands: List[Dict[int, List[str]]] = [{} for _ in BAND_WIDTHS]
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        conn = get_sqlite_conn()
+        cursor = conn.cursor()
+        cursor.execute("SELECT article_id, signature FROM simhash_index")
+        rows = cursor.fetchall()
+        conn.close()
+        for article_id, signature in rows:
+            self._insert(article_id, _to_unsigned(signature))
+        self._loaded = True
+        print(f"Loaded {len(rows)} SimHash signatures")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def _insert(self, article_id: str, signature: int):
+        self._signatures[article_id] = signature
+        for band, value in zip(self._bands, _bands(signature)):
+            band.setdefault(value, []).append(article_id)
+
+    def find_duplicate(self, text: str) -> Tuple[Optional[str], int]:
+        """
+        Returns (article_id, signature) of the closest indexed article within
+        `max_distance` bits, or (None, signature) when nothing is close enough
+        or the text is too short to judge lexically.
+        """
+        self._ensure_loaded()
+        signature, shingle_count = simhash(text)
+        if shingle_count < MIN_SHINGLES:
+            return None, signature
+
+        best_id, best_distance = None, self.max_distance + 1
+        for band, value in zip(self._bands, _bands(signature)):
+            for candidate_id in band.get(value, ()):
+                distance = (self._signatures[candidate_id] ^ signature).bit_count()
+                if distance < best_distance:
+                    best_id, best_distance = candidate_id, distance
+        return best_id, signature
+
+    def add_many(self, items: List[Tuple[str, str]]):
+        """Indexes (article_id, text) pairs and persists their signatures."""
+        self._ensure_loaded()
+        rows = []
+        with self._lock:
+            for article_id, text in items:
+                if article_id in self._signatures:
+                    continue
+                signature, shingle_count = simhash(text)
+                if shingle_count < MIN_SHINGLES:
+                    continue
+                self._insert(article_id, signature)
+                rows.append((article_id, _to_signed(signature)))
+        if not rows:
+            return
+        conn = get_sqlite_conn()
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO simhash_index (article_id, signature) VALUES (?, ?)", rows)
+        finally:
+            conn.close()
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+from app.core.metrics import ERRORS
+
+# Flush attempts per batch before it is given up on
+STORAGE_MAX_ATTEMPTS = 3
+
+class StorageBuffer:
+    """
+    Collects items for the storage stage and hands them to `flush_fn` in
+    batches: whenever `batch_size` items are pending, or when the oldest
+    pending item is older than `flush_interval` seconds. A daemon thread
+    enforces the time bound so a quiet stream still gets flushed.
+    A batch whose write fails stays buffered and is retried on later flushes;
+    after `max_attempts` failures it is handed to `on_drop` and discarded.
+    """
+
+    def __init__(self, flush_fn: Callable[[List[Any]], None], batch_size: int = 100, flush_interval: float = 2.0, max_attempts: int = STORAGE_MAX_ATTEMPTS, on_drop: Optional[Callable[[List[Any]], None]] = None):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.on_drop = on_drop
+        self._pending: List[Any] = []
+        # (batch, failed attempts) waiting to be retried
+        self._failed: List[Tuple[List[Any], int]] = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        # Serializes flushes so batches are written in order
+        self._flush_lock = threading.Lock()
+        self._timer = None
+
+    def add(self, items: List[Any]):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(items)
+            full = len(self._pending) >= self.batch_size
+        self._ensure_timer()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes earlier failed batches, then everything pending, in chunks of
+        at most `batch_size`. Failures are logged and kept for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._oldest = None
+                batches, self._failed = self._failed, []
+            batches += [(pending[start:start + self.batch_size], 0) for start in range(0, len(pending), self.batch_size)]
+            for batch, attempts in batches:
+                try:
+                    self.flush_fn(batch)
+                except Exception as e:
+                    ERRORS.inc(component="storage_flush")
+                    self._retry_or_drop(batch, attempts + 1, e)
+
+    def _retry_or_drop(self, batch: List[Any], attempts: int, error: Exception):
+        if attempts < self.max_attempts:
+            print(f"Storage flush error (attempt {attempts}/{self.max_attempts}, will retry): {error}")
+            with self._lock:
+                self._failed.append((batch, attempts))
+            return
+        print(f"Storage flush error: giving up on {len(batch)} items after {attempts} attempts: {error}")
+        if self.on_drop is not None:
+            self.on_drop(batch)
+
+    def pending_count(self) -> int:
+        return len(self._pending) + sum(len(batch) for batch, _ in self._failed)
+
+    def _ensure_timer(self):
+        if self._timer is not None and self._timer.is_alive():
+            return
+        self._timer = threading.Thread(target=self._run_timer, name="storage-flush", daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval / 2)
+            with self._lock:
+                due = bool(self._failed) or (self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval)
+            if due:
+                try:
+                    self.flush()
+                except Exception as e:
+                    ERRORS.inc(component="storage_flush")
+                    print(f"Storage flush error: {e}")
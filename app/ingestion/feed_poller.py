@@ -1,10 +1,13 @@
 import time
 import uuid
+import asyncio
 import feedparser
 from datetime import datetime
-from typing import List
+from typing import List, Tuple
 from app.models.article import ArticleCreate, Article
-from app.core.database import save_article_to_sqlite
+from app.core.database import save_article_to_sqlite, is_known_article, get_article_from_sqlite
+from app.core.log_buffer import log_to_file
+from app.core.metrics import ERRORS
 
 # Real RSS Feed Sources
 RSS_FEEDS = [
@@ -15,68 +18,146 @@ RSS_FEEDS = [
     "https://www.financialexpress.com/feed/"
 ]
 
+# Per-feed fetch budget
+FEED_TIMEOUT = 10.0 # seconds per request
+FEED_MAX_RETRIES = 2
+FEED_RETRY_BACKOFF = 0.5 # seconds, doubled on each retry
+
 class IngestionService:
     def __init__(self):
         self.running = False
+        # url -> {"etag": ..., "last_modified": ...} for conditional GETs
+        self.feed_validators = {}
+        # Articles skipped because their id was already stored
+        self.skipped_known = 0
+        self.last_skipped = 0
+        # Feeds that failed to fetch or parse on the last fetch
+        self.last_feed_errors = 0
 
-    def fetch_from_feeds(self) -> List[ArticleCreate]:
-        articles = []
-        with open("ingestion.log", "a") as f:
-            f.write("Starting fetch_from_feeds...\n")
-        for url in RSS_FEEDS:
+    async def fetch_from_feeds_async(self) -> List[ArticleCreate]:
+        """
+        Fetches all RSS feeds concurrently over one pooled HTTP client.
+        Sends stored ETag/Last-Modified validators so unchanged feeds return 304
+        and are skipped. Each feed has its own timeout and retry budget.
+        """
+        entries = await self.fetch_raw_entries_async()
+        return [self.clean_entry(entry, source) for entry, source in entries]
+
+    async def fetch_raw_entries_async(self) -> List[Tuple[dict, str]]:
+        """Fetches and parses all feeds, returning uncleaned (entry, source) pairs."""
+        import httpx
+        log_to_file("ingestion.log", "Starting fetch_from_feeds...")
+        self.last_feed_errors = 0
+
+        limits = httpx.Limits(max_connections=len(RSS_FEEDS), max_keepalive_connections=len(RSS_FEEDS))
+        async with httpx.AsyncClient(limits=limits, follow_redirects=True) as client:
+            results = await asyncio.gather(*(self._fetch_feed(client, url) for url in RSS_FEEDS))
+
+        entries = []
+        for url, payload in zip(RSS_FEEDS, results):
+            if payload is None:
+                continue
+            content, headers = payload
             try:
-                print(f"Fetching from {url}...")
-                feed = feedparser.parse(url)
+                feed = feedparser.parse(content, response_headers=headers)
+                source = feed.feed.get('title', 'Unknown Source')
                 for entry in feed.entries[:5]: # Limit to 5 per feed for better coverage
-                    # Basic parsing
-                    title = entry.get('title', 'No Title')
-                    link = entry.get('link', '')
-                    summary = entry.get('summary', '')
-                    published = entry.get('published', str(datetime.now()))
-                    
-                    # Try to parse date, else use now
-                    try:
-                        # feedparser usually returns struct_time
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            dt = datetime.fromtimestamp(time.mktime(entry.published_parsed))
-                        else:
-                            dt = datetime.now()
-                    except:
-                        dt = datetime.now()
-
-                    # Clean HTML from summary/content
-                    from bs4 import BeautifulSoup
-                    import hashlib
-                    
-                    raw_content = summary if summary else title
-                    # Parse with BS4 to remove tags
-                    soup = BeautifulSoup(raw_content, "html.parser")
-                    clean_content = soup.get_text(separator=" ", strip=True)
-                    
-                    # Clean title as well just in case
-                    clean_title = BeautifulSoup(title, "html.parser").get_text(separator=" ", strip=True)
-
-                    # Generate stable ID based on URL
-                    article_id = hashlib.md5(link.encode()).hexdigest()
-
-                    articles.append(ArticleCreate(
-                        title=clean_title,
-                        content=clean_content,
-                        source=feed.feed.get('title', 'Unknown Source'),
-                        published_at=dt,
-                        url=link
-                    ))
+                    entries.append((entry, source))
             except Exception as e:
-                print(f"Error fetching {url}: {e}")
-        return articles
+                ERRORS.inc(component="feed_parse")
+                self.last_feed_errors += 1
+                print(f"Error parsing {url}: {e}")
+        return entries
+
+    def fetch_from_feeds(self) -> List[ArticleCreate]:
+        """Blocking wrapper around `fetch_from_feeds_async` for non-async callers."""
+        return asyncio.run(self.fetch_from_feeds_async())
+
+    async def _fetch_feed(self, client, url: str):
+        """
+        Returns (content, headers) for a feed, or None if it is unchanged (304)
+        or could not be fetched within the retry budget.
+        """
+        import httpx
+        headers = {}
+        validators = self.feed_validators.get(url, {})
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        for attempt in range(FEED_MAX_RETRIES + 1):
+            try:
+                print(f"Fetching from {url}...")
+                response = await client.get(url, headers=headers, timeout=FEED_TIMEOUT)
+                if response.status_code == 304:
+                    print(f"Not modified: {url}")
+                    return None
+                response.raise_for_status()
+
+                self.feed_validators[url] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                return response.content, dict(response.headers)
+            except (httpx.HTTPError, httpx.StreamError) as e:
+                if attempt == FEED_MAX_RETRIES:
+                    ERRORS.inc(component="feed_fetch")
+                    self.last_feed_errors += 1
+                    print(f"Error fetching {url}: {e}")
+                    return None
+                await asyncio.sleep(FEED_RETRY_BACKOFF * (2 ** attempt))
+
+    def clean_entry(self, entry, source: str) -> ArticleCreate:
+        """Turns a raw feed entry into an ArticleCreate with HTML stripped."""
+        # Basic parsing
+        title = entry.get('title', 'No Title')
+        link = entry.get('link', '')
+        summary = entry.get('summary', '')
+
+        # Try to parse date, else use now
+        try:
+            # feedparser usually returns struct_time
+            if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                dt = datetime.fromtimestamp(time.mktime(entry.published_parsed))
+            else:
+                dt = datetime.now()
+        except:
+            dt = datetime.now()
+
+        # Clean HTML from summary/content
+        from bs4 import BeautifulSoup
+
+        raw_content = summary if summary else title
+        # Parse with BS4 to remove tags
+        soup = BeautifulSoup(raw_content, "html.parser")
+        clean_content = soup.get_text(separator=" ", strip=True)
+
+        # Clean title as well just in case
+        clean_title = BeautifulSoup(title, "html.parser").get_text(separator=" ", strip=True)
+
+        return ArticleCreate(
+            title=clean_title,
+            content=clean_content,
+            source=source,
+            published_at=dt,
+            url=link
+        )
 
     def process_article(self, article_create: ArticleCreate) -> Article:
-        with open("ingestion.log", "a") as f:
-            f.write(f"Processing article: {article_create.title}\n")
+        log_to_file("ingestion.log", f"Processing article: {article_create.title}")
         # Create initial Article object with stable ID
         # We use the URL hash as the ID to prevent duplicates on re-ingestion
         import hashlib
         article_id = hashlib.md5(article_create.url.encode()).hexdigest()
+
+        # Fast path: already ingested, return the stored copy
+        if is_known_article(article_id):
+            stored = get_article_from_sqlite(article_id)
+            if stored:
+                self.skipped_known += 1
+                print(f"Skipped known article: {article_create.title}")
+                return Article(**stored)
         
         article = Article(
             id=article_id,
@@ -91,6 +172,46 @@ class IngestionService:
         print(f"Processed: {processed_article.title} (Duplicate: {processed_article.is_duplicate})")
         return processed_article
 
+    def process_batch(self, article_creates: List[ArticleCreate]) -> List[Article]:
+        """
+        Runs a whole fetch cycle through the batched LangGraph workflow,
+        so embeddings are computed in one pass and reused for storage.
+        """
+        if not article_creates:
+            return []
+
+        log_to_file("ingestion.log", f"Processing batch of {len(article_creates)} articles")
+
+        import hashlib
+        articles = []
+        seen_ids = set()
+        skipped = 0
+        for article_create in article_creates:
+            article_id = hashlib.md5(article_create.url.encode()).hexdigest()
+            # The same link can appear in more than one feed
+            if article_id in seen_ids:
+                continue
+            seen_ids.add(article_id)
+            # Fast path: already ingested on a previous poll
+            if is_known_article(article_id):
+                skipped += 1
+                continue
+            articles.append(Article(id=article_id, **article_create.model_dump()))
+
+        self.skipped_known += skipped
+        self.last_skipped = skipped
+        print(f"Skipped {skipped} known articles, {len(articles)} new")
+        if not articles:
+            return []
+
+        from app.agents.workflow import app_batch_workflow
+        result = app_batch_workflow.invoke({"articles": articles, "embeddings": []})
+        processed_articles = result["articles"]
+
+        duplicates = sum(1 for a in processed_articles if a.is_duplicate)
+        print(f"Processed batch: {len(processed_articles)} articles ({duplicates} duplicates)")
+        return processed_articles
+
     def run_real_stream(self, interval=60):
         """Polls RSS feeds every `interval` seconds."""
         self.running = True
@@ -98,11 +219,9 @@ class IngestionService:
         try:
             while self.running:
                 articles = self.fetch_from_feeds()
-                with open("ingestion.log", "a") as f:
-                    f.write(f"Fetched {len(articles)} articles. Processing...\n")
+                log_to_file("ingestion.log", f"Fetched {len(articles)} articles. Processing...")
                 print(f"Fetched {len(articles)} articles. Processing...")
-                for art in articles:
-                    self.process_article(art)
+                self.process_batch(articles)
                 print(f"Sleeping for {interval} seconds...")
                 time.sleep(interval)
         except KeyboardInterrupt:
@@ -114,5 +233,20 @@ if __name__ == "__main__":
     from app.core.database import init_db
     init_db()
     
-    service = IngestionService()
-    service.run_real_stream()
+    import argparse
+    parser = argparse.ArgumentParser(description="Poll RSS feeds and ingest new articles")
+    parser.add_argument("--pipeline", action="store_true", help="staged streaming pipeline with bounded queues between stages")
+    parser.add_argument("--workers", type=int, help="shard articles across this many worker processes (0 = one per core)")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        # Coordinator fetches and deduplicates; workers clean, embed, extract and store
+        from app.ingestion.workers import ShardedIngestion
+        ShardedIngestion(workers=args.workers).run_forever()
+    elif args.pipeline:
+        # Staged streaming pipeline with bounded queues between stages
+        from app.ingestion.pipeline import StreamingPipeline
+        StreamingPipeline().run_forever()
+    else:
+        service = IngestionService()
+        service.run_real_stream()
@@ -0,0 +1,103 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from app.ingestion.feed_poller import IngestionService
+
+# Articles per workflow invocation, so job progress updates while it runs
+JOB_CHUNK_SIZE = 25
+# Finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 100
+
+class IngestionJob:
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = "queued" # queued, running, completed, failed
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.fetched = 0
+        self.processed = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = 0
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "fetched": self.fetched,
+            "processed": self.processed,
+            "duplicates": self.duplicates,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "error": self.error,
+        }
+
+class IngestionJobManager:
+    """
+    Runs ingestion cycles on a single background worker thread so HTTP
+    handlers return immediately. At most one job is queued or running at a
+    time; submitting while one is active returns the existing job.
+    """
+
+    def __init__(self, service: IngestionService = None):
+        self.service = service or IngestionService()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._active: Optional[IngestionJob] = None
+        self._lock = threading.Lock()
+
+    def submit(self) -> Tuple[IngestionJob, bool]:
+        """Returns (job, created); created is False if an active job was reused."""
+        with self._lock:
+            if self._active is not None and self._active.status in ("queued", "running"):
+                return self._active, False
+            job = IngestionJob(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            self._active = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in ("completed", "failed")]
+        finished.sort(key=lambda j: j.created_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def _run(self, job: IngestionJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            articles = self.service.fetch_from_feeds()
+            job.fetched = len(articles)
+            job.errors += self.service.last_feed_errors
+            for start in range(0, len(articles), JOB_CHUNK_SIZE):
+                chunk = articles[start:start + JOB_CHUNK_SIZE]
+                try:
+                    processed = self.service.process_batch(chunk)
+                except Exception as e:
+                    print(f"Ingestion job {job.id} chunk error: {e}")
+                    job.errors += len(chunk)
+                    continue
+                job.skipped += self.service.last_skipped
+                job.processed += len(processed)
+                job.duplicates += sum(1 for a in processed if a.is_duplicate)
+                # Stored with the General fallback after the LLM call failed
+                job.errors += sum(1 for a in processed if a.extraction_failed)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Ingestion job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
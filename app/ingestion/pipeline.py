@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from app.models.article import Article
+from app.core.database import is_known_article
+from app.core.metrics import DUPLICATES, ERRORS
+from app.ingestion.feed_poller import IngestionService
+
+# Pipeline settings
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+CLEAN_WORKERS = int(os.getenv("PIPELINE_CLEAN_WORKERS", "2"))
+EXTRACT_WORKERS = int(os.getenv("PIPELINE_EXTRACT_WORKERS", "4"))
+DEDUP_BATCH_SIZE = int(os.getenv("PIPELINE_DEDUP_BATCH_SIZE", "32"))
+DEDUP_BATCH_WAIT = 0.5 # seconds to wait for a dedup micro-batch to fill
+# Unique articles still on their way to storage, checked by the dedup stage
+IN_FLIGHT_WINDOW = 2000
+MONITOR_INTERVAL = 30.0
+
+# Sentinel telling a stage worker to exit once everything before it is done
+_STOP = object()
+
+class Stage:
+    """
+    A pool of worker threads reading from `inbox` and writing handler results
+    to `outbox`. Both queues are bounded, so a slow stage blocks the puts of
+    the stage before it and backpressure propagates up to the fetcher.
+    With `batch_size > 1` the handler receives a list of up to that many items.
+    """
+
+    def __init__(self, name: str, handler: Callable, inbox: queue.Queue, outbox: Optional[queue.Queue], workers: int = 1, batch_size: int = 1, batch_wait: float = 0.0):
+        self.name = name
+        self.handler = handler
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.processed = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Lets queued items drain, then stops every worker."""
+        for _ in self._threads:
+            self.inbox.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _next_batch(self) -> Tuple[List[Any], bool]:
+        item = self.inbox.get()
+        if item is _STOP:
+            return [], True
+        items = [item]
+        deadline = time.monotonic() + self.batch_wait
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.inbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Process what we have, then exit
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _run(self):
+        while True:
+            items, stopping = self._next_batch()
+            if items:
+                try:
+                    results = self.handler(items if self.batch_size > 1 else items[0])
+                    if self.outbox is not None:
+                        for result in results:
+                            self.outbox.put(result)
+                    with self._lock:
+                        self.processed += len(items)
+                except Exception as e:
+                    ERRORS.inc(component=f"pipeline_{self.name}")
+                    print(f"Pipeline stage {self.name} error: {e}")
+                    with self._lock:
+                        self.errors += len(items)
+            if stopping:
+                break
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.inbox.qsize(),
+            "queue_capacity": self.inbox.maxsize,
+            "workers": self.workers,
+            "processed": self.processed,
+            "errors": self.errors,
+        }
+
+class InFlightWindow:
+    """
+    Vectors of the most recent unique articles that passed dedup but may not
+    have reached the vector store yet. `check` marks articles that duplicate
+    one of them, then adds the remaining unique ones to the window.
+    """
+
+    def __init__(self, threshold: float, size: int = IN_FLIGHT_WINDOW):
+        self.threshold = threshold
+        self.size = size
+        self._ids: List[str] = []
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def check(self, articles: List[Article], embeddings: List[Optional[List[float]]]):
+        rows = [i for i, a in enumerate(articles) if not a.is_duplicate and embeddings[i] is not None]
+        if not rows:
+            return
+        vectors = np.asarray([embeddings[i] for i in rows], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        if len(self._ids):
+            similarities = vectors @ self._vectors.T
+            best = similarities.argmax(axis=1)
+            for row, i in enumerate(rows):
+                if similarities[row, best[row]] >= self.threshold:
+                    articles[i].is_duplicate = True
+                    articles[i].duplicate_of_id = self._ids[best[row]]
+                    DUPLICATES.inc(method="in_flight")
+                    print(f"Duplicate found (in flight)! {articles[i].title} is similar to {articles[i].duplicate_of_id}")
+
+        unique_rows = [row for row, i in enumerate(rows) if not articles[i].is_duplicate]
+        if unique_rows:
+            new_ids = [articles[rows[row]].id for row in unique_rows]
+            new_vectors = vectors[unique_rows]
+            if len(self._ids):
+                new_vectors = np.vstack([self._vectors, new_vectors])
+                new_ids = self._ids + new_ids
+            self._ids = new_ids[-self.size:]
+            self._vectors = new_vectors[-self.size:]
+
+class StreamingPipeline:
+    """
+    Continuous ingestion: fetch -> clean -> dedup -> extract -> store, each
+    stage with its own workers and a bounded queue in front of it.
+    Dedup runs as a single worker on micro-batches so duplicate decisions stay
+    consistent; it also checks against unique articles that are still in
+    flight to storage. Storage goes through the workflow's StorageBuffer,
+    which flushes every couple of seconds so articles become searchable quickly.
+    """
+
+    def __init__(self, interval: float = 60, service: IngestionService = None):
+        # Imported here so building a pipeline doesn't construct agents at import time
+        from app.agents.workflow import dedup_agent, extraction_agent, storage_buffer
+        self.dedup_agent = dedup_agent
+        self.extraction_agent = extraction_agent
+        self.storage_buffer = storage_buffer
+        # Articles the buffer gave up on were never stored; release them so the next poll retries them
+        self.storage_buffer.on_drop = lambda items: [self._release(article.id) for article, _ in items]
+
+        self.interval = interval
+        self.service = service or IngestionService()
+        self._stop_event = threading.Event()
+        self._fetch_thread: Optional[threading.Thread] = None
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self.fetched = 0
+        self.skipped_known = 0
+
+        # Recently deduplicated unique articles, not yet guaranteed to be in Chroma
+        self.in_flight_window = InFlightWindow(self.dedup_agent.threshold)
+
+        clean_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        dedup_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        extract_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        store_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self.stages = [
+            Stage("clean", self._clean, clean_q, dedup_q, workers=CLEAN_WORKERS),
+            Stage("dedup", self._dedup, dedup_q, extract_q, batch_size=DEDUP_BATCH_SIZE, batch_wait=DEDUP_BATCH_WAIT),
+            Stage("extract", self._extract, extract_q, store_q, workers=EXTRACT_WORKERS),
+            Stage("store", self._store, store_q, None),
+        ]
+
+    # Stage handlers
+
+    def _clean(self, item) -> List[Article]:
+        entry, source, article_id = item
+        try:
+            article_create = self.service.clean_entry(entry, source)
+        except Exception:
+            self._release(article_id)
+            raise
+        return [Article(id=article_id, **article_create.model_dump())]
+
+    def _dedup(self, articles: List[Article]) -> List[tuple]:
+        try:
+            embeddings = self.dedup_agent.process_batch(articles)
+            self.in_flight_window.check(articles, embeddings)
+        except Exception:
+            for article in articles:
+                self._release(article.id)
+            raise
+        return list(zip(articles, embeddings))
+
+    def _extract(self, item) -> List[tuple]:
+        article, embedding = item
+        if not article.is_duplicate:
+            self.extraction_agent.process(article)
+        return [(article, embedding)]
+
+    def _store(self, item) -> List[tuple]:
+        self.storage_buffer.add([item])
+        return []
+
+    # Helpers
+
+    def _release(self, article_id: str):
+        with self._in_flight_lock:
+            self._in_flight.discard(article_id)
+
+    def _fetch_loop(self):
+        clean_q = self.stages[0].inbox
+        while not self._stop_event.is_set():
+            try:
+                entries = asyncio.run(self.service.fetch_raw_entries_async())
+            except Exception as e:
+                print(f"Pipeline fetch error: {e}")
+                entries = []
+
+            with self._in_flight_lock:
+                # Anything that reached storage is now covered by the known-id index
+                self._in_flight = {aid for aid in self._in_flight if not is_known_article(aid)}
+
+            queued = 0
+            for entry, source in entries:
+                if self._stop_event.is_set():
+                    break
+                article_id = hashlib.md5(entry.get('link', '').encode()).hexdigest()
+                with self._in_flight_lock:
+                    if article_id in self._in_flight or is_known_article(article_id):
+                        self.skipped_known += 1
+                        continue
+                    self._in_flight.add(article_id)
+                # Blocks while the clean queue is full (backpressure)
+                clean_q.put((entry, source, article_id))
+                queued += 1
+            self.fetched += len(entries)
+            print(f"Pipeline fetched {len(entries)} entries, queued {queued}")
+
+            self._stop_event.wait(self.interval)
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(MONITOR_INTERVAL):
+            depths = ", ".join(f"{name}={info['queue_depth']}/{info['queue_capacity']}" for name, info in self.snapshot()["stages"].items())
+            print(f"Pipeline queues: {depths}")
+
+    # Lifecycle
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        self._fetch_thread = threading.Thread(target=self._fetch_loop, name="fetch", daemon=True)
+        self._fetch_thread.start()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name="pipeline-monitor", daemon=True)
+        self._monitor_thread.start()
+
+    def stop(self):
+        """Stops fetching, drains every queue in order, then flushes storage."""
+        print("Stopping pipeline, draining in-flight work...")
+        self._stop_event.set()
+        if self._fetch_thread is not None:
+            self._fetch_thread.join()
+        for stage in self.stages:
+            stage.stop()
+        self.storage_buffer.flush()
+        print("Pipeline stopped.")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "fetched": self.fetched,
+            "skipped_known": self.skipped_known,
+            "in_flight": len(self._in_flight),
+            "pending_storage": self.storage_buffer.pending_count(),
+            "stages": {stage.name: stage.snapshot() for stage in self.stages},
+        }
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+if __name__ == "__main__":
+    from app.core.database import init_db
+    init_db()
+
+    StreamingPipeline().run_forever()
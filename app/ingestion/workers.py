@@ -0,0 +1,312 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.models.article import Article
+from app.core.database import is_known_article, mark_article_known
+from app.core.metrics import ERRORS
+from app.ingestion.feed_poller import IngestionService
+from app.ingestion.pipeline import DEDUP_BATCH_SIZE, DEDUP_BATCH_WAIT, MONITOR_INTERVAL, PIPELINE_QUEUE_SIZE, InFlightWindow
+
+# Sharded ingestion settings
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) # 0 = one per core
+WORKER_STOP_TIMEOUT = 60.0 # seconds to wait for a worker to drain on shutdown
+
+def shard_for(article_id: str, workers: int) -> int:
+    """Worker index for an article: its MD5 id modulo the worker count."""
+    return int(article_id, 16) % workers
+
+# Worker process
+
+def _next_batch(inbox, batch_size: int, batch_wait: float):
+    """Up to `batch_size` items, waiting at most `batch_wait` after the first. None in the queue means stop."""
+    item = inbox.get()
+    if item is None:
+        return [], True
+    items = [item]
+    deadline = time.monotonic() + batch_wait
+    while len(items) < batch_size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = inbox.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is None:
+            return items, True
+        items.append(item)
+    return items, False
+
+def _worker_main(worker_id: int, workers: int, inbox, outbox, replies, threads: int):
+    """
+    One shard: cleans entries, embeds them with the process's own model,
+    asks the coordinator for duplicate verdicts, runs extraction for the
+    unique ones and saves the batch to SQLite. Vectors go back to the
+    coordinator, which is the only writer of the vector store.
+    """
+    from app.agents.extraction import MISTRAL_REQUESTS_PER_SECOND, MISTRAL_TOKENS_PER_MINUTE, ExtractionAgent
+    from app.core.database import save_articles_to_sqlite
+    from app.core.embedders import EMBEDDING_BACKEND, create_embedder
+    from app.core.model_registry import DEFAULT_EMBEDDING_MODEL, register_model
+    from app.core.rate_limit import TokenBucketRateLimiter
+
+    model = create_embedder(EMBEDDING_BACKEND, DEFAULT_EMBEDDING_MODEL, threads=threads)
+    register_model(DEFAULT_EMBEDDING_MODEL, model)
+    # The provider's limits apply to the whole deployment, so each worker gets its share
+    rate_limiter = TokenBucketRateLimiter(MISTRAL_REQUESTS_PER_SECOND / workers, MISTRAL_TOKENS_PER_MINUTE / workers)
+    extraction_agent = ExtractionAgent(rate_limiter=rate_limiter)
+    service = IngestionService()
+    print(f"Ingestion worker {worker_id} ready (pid {os.getpid()}, {threads} threads)")
+
+    while True:
+        items, stopping = _next_batch(inbox, DEDUP_BATCH_SIZE, DEDUP_BATCH_WAIT)
+        if items:
+            start = time.perf_counter()
+            articles: List[Article] = []
+            failed: List[str] = []
+            for entry, source, article_id in items:
+                try:
+                    articles.append(Article(id=article_id, **service.clean_entry(entry, source).model_dump()))
+                except Exception as e:
+                    print(f"Worker {worker_id} clean error: {e}")
+                    failed.append(article_id)
+            try:
+                vectors = model.encode_batch([f"{a.title} {a.content}" for a in articles])
+                outbox.put(("dedup", worker_id, articles, vectors))
+                for article, (is_duplicate, duplicate_of_id) in zip(articles, replies.get()):
+                    article.is_duplicate = is_duplicate
+                    article.duplicate_of_id = duplicate_of_id
+                extraction_agent.process_batch([a for a in articles if not a.is_duplicate])
+                save_articles_to_sqlite([a.model_dump() for a in articles])
+                outbox.put(("stored", worker_id, articles, vectors, failed, time.perf_counter() - start))
+            except Exception as e:
+                print(f"Worker {worker_id} error: {e}")
+                outbox.put(("failed", worker_id, failed + [a.id for a in articles], time.perf_counter() - start))
+        if stopping:
+            break
+    outbox.put(("exit", worker_id))
+
+# Coordinator
+
+class WorkerStats:
+    def __init__(self):
+        self.processed = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+class ShardedIngestion:
+    """
+    Ingestion across `workers` processes, sharded by article id, so cleaning
+    and embedding are not limited to one core by the GIL.
+    This process is the coordinator: it fetches feeds, skips known and
+    in-flight ids, and is the single dedup owner. Workers send their
+    embeddings back for a verdict, which is decided one batch at a time
+    against the vector store and the in-flight window, and send the vectors
+    of stored articles back so only the coordinator writes the vector store.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, interval: float = 60, service: IngestionService = None):
+        # Imported here so building the coordinator doesn't construct agents at import time
+        from app.agents.workflow import dedup_agent
+        self.dedup_agent = dedup_agent
+        self.workers = workers or os.cpu_count() or 1
+        self.interval = interval
+        self.service = service or IngestionService()
+        self.in_flight_window = InFlightWindow(self.dedup_agent.threshold)
+        self._stop_event = threading.Event()
+        self._in_flight = set()
+        self._in_flight_lock = threading.Lock()
+        self.fetched = 0
+        self.skipped_known = 0
+        self.stats = [WorkerStats() for _ in range(self.workers)]
+        self._started_at: Optional[float] = None
+        self._processes: List[multiprocessing.Process] = []
+        self._fetch_thread: Optional[threading.Thread] = None
+        self._results_thread: Optional[threading.Thread] = None
+        self._monitor_thread: Optional[threading.Thread] = None
+
+        context = multiprocessing.get_context("spawn")
+        self._context = context
+        self._inboxes = [context.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in range(self.workers)]
+        self._replies = [context.Queue() for _ in range(self.workers)]
+        self._outbox = context.Queue()
+
+    # Message handlers (results thread only)
+
+    def _on_dedup(self, worker_id: int, articles: List[Article], vectors: np.ndarray):
+        try:
+            embeddings = self.dedup_agent.process_batch(articles, vectors)
+            self.in_flight_window.check(articles, embeddings)
+        except Exception as e:
+            ERRORS.inc(component="ingest_dedup")
+            print(f"Coordinator dedup error: {e}")
+            # Let the batch through as unique rather than leave the worker waiting
+            for article in articles:
+                article.is_duplicate = False
+                article.duplicate_of_id = None
+        self._replies[worker_id].put([(a.is_duplicate, a.duplicate_of_id) for a in articles])
+
+    def _on_stored(self, worker_id: int, articles: List[Article], vectors: np.ndarray, failed: List[str], seconds: float):
+        try:
+            self.dedup_agent.add_batch_to_chroma(articles, [vector.tolist() for vector in vectors])
+        except Exception as e:
+            ERRORS.inc(component="ingest_vectors")
+            print(f"Coordinator vector store error: {e}")
+        # The worker saved them to SQLite, which only updates the known-id index in its own process
+        for article in articles:
+            mark_article_known(article.id)
+        stats = self.stats[worker_id]
+        stats.processed += len(articles)
+        stats.duplicates += sum(1 for a in articles if a.is_duplicate)
+        # Extraction fallbacks are stored (as General) but still count as errors
+        stats.errors += len(failed) + sum(1 for a in articles if a.extraction_failed)
+        stats.busy_seconds += seconds
+        self._release([a.id for a in articles] + failed)
+
+    def _on_failed(self, worker_id: int, article_ids: List[str], seconds: float):
+        ERRORS.inc(amount=len(article_ids), component="ingest_worker")
+        self.stats[worker_id].errors += len(article_ids)
+        self.stats[worker_id].busy_seconds += seconds
+        self._release(article_ids)
+
+    def _release(self, article_ids: List[str]):
+        with self._in_flight_lock:
+            self._in_flight.difference_update(article_ids)
+
+    # Threads
+
+    def _results_loop(self):
+        running = set(range(self.workers))
+        while running:
+            try:
+                message = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                # A worker that died without saying goodbye
+                running = {i for i in running if self._processes[i].is_alive()}
+                continue
+            kind, worker_id, *payload = message
+            if kind == "dedup":
+                self._on_dedup(worker_id, *payload)
+            elif kind == "stored":
+                self._on_stored(worker_id, *payload)
+            elif kind == "failed":
+                self._on_failed(worker_id, *payload)
+            elif kind == "exit":
+                running.discard(worker_id)
+
+    def _fetch_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                entries = asyncio.run(self.service.fetch_raw_entries_async())
+            except Exception as e:
+                print(f"Coordinator fetch error: {e}")
+                entries = []
+
+            queued = 0
+            for entry, source in entries:
+                if self._stop_event.is_set():
+                    break
+                article_id = hashlib.md5(entry.get('link', '').encode()).hexdigest()
+                with self._in_flight_lock:
+                    if article_id in self._in_flight or is_known_article(article_id):
+                        self.skipped_known += 1
+                        continue
+                    self._in_flight.add(article_id)
+                # Blocks while that worker's queue is full (backpressure)
+                self._inboxes[shard_for(article_id, self.workers)].put((entry, source, article_id))
+                queued += 1
+            self.fetched += len(entries)
+            print(f"Coordinator fetched {len(entries)} entries, queued {queued}")
+
+            self._stop_event.wait(self.interval)
+
+    def _monitor_loop(self):
+        while not self._stop_event.wait(MONITOR_INTERVAL):
+            self.report()
+
+    # Lifecycle
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        # Split the cores between workers so their math libraries don't oversubscribe
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        for worker_id in range(self.workers):
+            process = self._context.Process(
+                target=_worker_main,
+                args=(worker_id, self.workers, self._inboxes[worker_id], self._outbox, self._replies[worker_id], threads),
+                name=f"ingest-worker-{worker_id}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        self._results_thread = threading.Thread(target=self._results_loop, name="ingest-results", daemon=True)
+        self._results_thread.start()
+        self._fetch_thread = threading.Thread(target=self._fetch_loop, name="fetch", daemon=True)
+        self._fetch_thread.start()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name="ingest-monitor", daemon=True)
+        self._monitor_thread.start()
+        print(f"Sharded ingestion started with {self.workers} workers")
+
+    def stop(self):
+        """Stops fetching, lets every worker drain its shard, then stops them."""
+        print("Stopping sharded ingestion, draining workers...")
+        self._stop_event.set()
+        if self._fetch_thread is not None:
+            self._fetch_thread.join()
+        for inbox in self._inboxes:
+            inbox.put(None)
+        if self._results_thread is not None:
+            self._results_thread.join(WORKER_STOP_TIMEOUT)
+        for process in self._processes:
+            process.join(WORKER_STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+        self.report()
+        print("Sharded ingestion stopped.")
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        workers = {}
+        for worker_id, stats in enumerate(self.stats):
+            workers[worker_id] = {
+                "alive": worker_id < len(self._processes) and self._processes[worker_id].is_alive(),
+                "queue_depth": self._inboxes[worker_id].qsize(),
+                "processed": stats.processed,
+                "duplicates": stats.duplicates,
+                "errors": stats.errors,
+                "busy_seconds": stats.busy_seconds,
+                # Over wall time, and over the time the worker was actually busy
+                "articles_per_s": stats.processed / elapsed if elapsed else 0.0,
+                "busy_articles_per_s": stats.processed / stats.busy_seconds if stats.busy_seconds else 0.0,
+            }
+        processed = sum(stats.processed for stats in self.stats)
+        return {
+            "workers": workers,
+            "fetched": self.fetched,
+            "skipped_known": self.skipped_known,
+            "in_flight": len(self._in_flight),
+            "processed": processed,
+            "articles_per_s": processed / elapsed if elapsed else 0.0,
+        }
+
+    def report(self):
+        snapshot = self.snapshot()
+        for worker_id, info in snapshot["workers"].items():
+            print(f"Worker {worker_id}: {info['processed']} articles ({info['duplicates']} duplicates, {info['errors']} errors), "
+                  f"{info['articles_per_s']:.1f}/s wall, {info['busy_articles_per_s']:.1f}/s busy, queue {info['queue_depth']}")
+        print(f"Total: {snapshot['processed']} articles, {snapshot['articles_per_s']:.1f}/s, {snapshot['in_flight']} in flight")
+
+    def run_forever(self):
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stop()
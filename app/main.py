@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from app.api.endpoints import router
 from app.core.database import init_db
+from app.core.metrics import HTTP_DURATION, render_prometheus
+from app.core.model_registry import warm_up
 from dotenv import load_dotenv
+import os
 load_dotenv()          # reads .env in the project root
 app = FastAPI(title="AI-Powered Financial News Intelligence System")
+API_PREFIX = "/api"
 
 @app.on_event("startup")
 async def startup_event():
@@ -14,7 +20,32 @@ async def startup_event():
     except Exception as e:
         print(f"STARTUP ERROR: {e}")
 
-app.include_router(router, prefix="/api")
+    # Load the embedding model in the background so startup is not blocked
+    if os.getenv("WARMUP_MODELS", "1") == "1":
+        warm_up(background=True)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template (e.g. /api/stocks/{symbol}) to keep cardinality bounded;
+    # for streaming responses this is the time to the first byte
+    route = request.scope.get("route")
+    if route is None:
+        label = "unmatched"
+    elif route in router.routes:
+        label = API_PREFIX + route.path
+    else:
+        label = route.path
+    HTTP_DURATION.observe(time.perf_counter() - start, method=request.method, route=label, status=str(response.status_code))
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+app.include_router(router, prefix=API_PREFIX)
 
 if __name__ == "__main__":
     import uvicorn
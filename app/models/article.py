@@ -40,6 +40,8 @@ class Article(BaseModel):
     is_duplicate: bool = False
     duplicate_of_id: Optional[str] = None
     sector: str = "General" # Banking, IT, Energy, etc.
+    # Set when the LLM call failed and the General fallback was stored
+    extraction_failed: bool = False
     
     # Embedding (optional to store here, usually in Vector DB)
     embedding_id: Optional[str] = None
@@ -0,0 +1,6 @@
+from app.core.database import init_db, backfill_chroma_published_at
+
+if __name__ == "__main__":
+    # Adds epoch published_at to vectors stored before time filtering existed
+    init_db()
+    backfill_chroma_published_at()
@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timedelta
+from typing import List
+from xml.sax.saxutils import escape
+
+COMPANIES = ["HDFC Bank", "Reliance Industries", "Infosys", "TCS", "ICICI Bank", "Tata Motors", "Sun Pharma", "Adani Ports", "Bharti Airtel", "Maruti Suzuki"]
+REGULATORS = ["RBI", "SEBI", "IRDAI"]
+EVENTS = ["reports quarterly results", "raises target price", "announces buyback", "faces penalty", "wins large order", "cuts lending rates", "misses estimates", "expands capacity"]
+FILLER = "analysts said the move was broadly in line with expectations while investors tracked global cues and domestic flows during the session".split()
+
+def make_corpus(n: int, seed: int = 42, duplicate_rate: float = 0.2) -> List[dict]:
+    """
+    Builds `n` synthetic articles as dicts with title/content/source/url/published_at.
+    About `duplicate_rate` of them are lightly edited copies of earlier ones,
+    so dedup stages see a realistic mix.
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1, 9, 0, 0)
+    articles = []
+    for i in range(n):
+        if articles and rng.random() < duplicate_rate:
+            original = rng.choice(articles)
+            title = original["title"]
+            content = original["content"].replace("said", "noted", 1)
+        else:
+            company = rng.choice(COMPANIES)
+            regulator = rng.choice(REGULATORS)
+            event = rng.choice(EVENTS)
+            title = f"{company} {event} as {regulator} review continues ({i})"
+            words = rng.sample(FILLER, k=len(FILLER))
+            content = f"{company} {event}. {regulator} commentary: " + " ".join(words) + f" Reference {i}."
+        articles.append({
+            "title": title,
+            "content": content,
+            "source": f"Bench Source {i % 5}",
+            "url": f"https://bench.example/{i}",
+            "published_at": now - timedelta(minutes=i),
+        })
+    return articles
+
+def make_feed_xml(articles: List[dict], title: str = "Benchmark Feed") -> bytes:
+    """Renders articles as an RSS 2.0 document, summaries wrapped in HTML like real feeds."""
+    items = []
+    for a in articles:
+        summary = f"<p><b>{a['title']}</b></p><p>{a['content']}</p><img src=\"https://bench.example/img.png\"/>"
+        items.append(
+            "<item>"
+            f"<title>{escape(a['title'])}</title>"
+            f"<link>{escape(a['url'])}</link>"
+            f"<description>{escape(summary)}</description>"
+            f"<pubDate>{a['published_at'].strftime('%a, %d %b %Y %H:%M:%S +0530')}</pubDate>"
+            "</item>"
+        )
+    xml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0"><channel>'
+        f"<title>{escape(title)}</title><link>https://bench.example</link><description>Benchmark</description>"
+        + "".join(items) +
+        "</channel></rss>"
+    )
+    return xml.encode("utf-8")
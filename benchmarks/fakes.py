@@ -0,0 +1,118 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+# Re-exported: the deterministic embedder lives with the other backends
+from app.core.embedders import HashingEmbedder
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+class StubChatModel:
+    """
+    Offline chat model with the `invoke`/`ainvoke` surface the agents use.
+    Returns a fixed extraction or expansion payload after `latency` seconds.
+    """
+
+    EXTRACTION_RESPONSE = json.dumps({
+        "sector": "Banking",
+        "entities": [
+            {"name": "HDFC Bank", "type": "COMPANY", "ticker": "HDFCBANK", "sentiment": "POSITIVE", "impact_score": 40, "reasoning": "Benchmark"},
+            {"name": "RBI", "type": "REGULATOR", "ticker": "NONE", "sentiment": "NEUTRAL", "impact_score": 0, "reasoning": "Benchmark"}
+        ]
+    })
+    EXPANSION_RESPONSE = json.dumps({"sector": "Banking", "terms": ["HDFCBANK", "private bank", "RBI"]})
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _respond(self, prompt: str) -> _Message:
+        self.calls += 1
+        if "search terms" in prompt:
+            return _Message(self.EXPANSION_RESPONSE)
+        return _Message(self.EXTRACTION_RESPONSE)
+
+    def invoke(self, prompt: str) -> _Message:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt: str) -> _Message:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+class StubMistralServer:
+    """
+    Local HTTP server speaking Mistral's chat completions API, for exercising
+    the real ChatMistralAI client (and its async HTTP client) offline. Every
+    `rate_limit_every`-th request is answered with a 429.
+
+        with StubMistralServer(latency=0.05) as server:
+            llm = ChatMistralAI(endpoint=server.endpoint, api_key="stub", max_retries=0)
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit_every: int = 0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real API, so the client pools connections
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    limited = stub.rate_limit_every and stub.requests % stub.rate_limit_every == 0
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if limited:
+                    self._send(429, {"message": "Requests rate limit exceeded"})
+                    return
+                prompt = body["messages"][-1]["content"]
+                content = StubChatModel.EXPANSION_RESPONSE if "search terms" in prompt else StubChatModel.EXTRACTION_RESPONSE
+                self._send(200, {
+                    "id": f"stub-{stub.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4},
+                })
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "StubMistralServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
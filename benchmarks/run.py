@@ -0,0 +1,264 @@
+"""
+Offline micro-benchmarks for each pipeline stage.
+
+    python -m benchmarks.run --n 200 --out bench.json
+    python -m benchmarks.run --n 200 --baseline benchmarks/baseline.json
+    python -m benchmarks.run --n 200 --save-baseline benchmarks/baseline.json
+
+Every stage runs against a throwaway SQLite/Chroma directory, a local HTTP
+server serving fixture RSS XML, and a stub chat model. The embedding model
+is the configured backend (EMBEDDING_BACKEND) when its weights are available
+locally, otherwise a deterministic hashing embedder; pick one explicitly with
+--embedder (e.g. --embedder onnx to measure the quantized CPU engine).
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import make_corpus, make_feed_xml
+from benchmarks.fakes import StubChatModel
+
+STAGES = ["fetch", "clean", "dedup", "add_to_chroma", "extraction", "sqlite_save", "query"]
+ENTRIES_PER_FEED = 5 # matches the per-feed limit in IngestionService
+# Regressions beyond this fraction are reported (and fail with --fail-on-regression)
+REGRESSION_TOLERANCE = 0.10
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    if lo == hi:
+        return sorted_values[int(k)]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def measure(items: list, op: Callable, items_per_op: int = 1) -> Dict[str, float]:
+    """Times `op(item)` for each item; reports per-op latency and items/sec throughput."""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        op(item)
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    latencies.sort()
+    count = len(items) * items_per_op
+    return {
+        "ops": len(items),
+        "items": count,
+        "total_s": total,
+        "throughput_per_s": count / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def serve_feeds(feeds: Dict[str, bytes]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = feeds.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def load_embedder(kind: str):
+    """`auto` tries the configured backend and falls back to hashing when weights are unavailable."""
+    from app.core.embedders import EMBEDDING_BACKEND, create_embedder
+    if kind == "fake":
+        kind = "hashing"
+    if kind == "auto":
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        try:
+            embedder = create_embedder(EMBEDDING_BACKEND)
+            return embedder, embedder.name
+        except Exception as e:
+            print(f"Embedding backend {EMBEDDING_BACKEND} unavailable ({e.__class__.__name__}); using hashing embedder")
+            kind = "hashing"
+    embedder = create_embedder(kind)
+    return embedder, embedder.name
+
+def run(n: int, stages: List[str], embedder_kind: str, repeat: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+    os.environ["WARMUP_MODELS"] = "0"
+
+    # Imported after chdir: database paths are resolved relative to the cwd
+    from app.core import model_registry
+    embedder, embedder_name = load_embedder(embedder_kind)
+    model_registry.register_model(model_registry.DEFAULT_EMBEDDING_MODEL, embedder)
+
+    from app.core.database import init_db, save_article_to_sqlite
+    from app.core.rate_limit import TokenBucketRateLimiter
+    from app.ingestion import feed_poller
+    from app.models.article import Article
+    init_db()
+
+    corpus = make_corpus(n)
+    articles = [
+        Article(id=f"bench-{i}", title=a["title"], content=a["content"], source=a["source"], published_at=a["published_at"], url=a["url"])
+        for i, a in enumerate(corpus)
+    ]
+    service = feed_poller.IngestionService()
+    results = {}
+
+    if "fetch" in stages:
+        feed_count = max(1, math.ceil(n / ENTRIES_PER_FEED))
+        feeds = {
+            f"/feed/{i}.xml": make_feed_xml(corpus[i * ENTRIES_PER_FEED:(i + 1) * ENTRIES_PER_FEED], title=f"Bench Feed {i}")
+            for i in range(feed_count)
+        }
+        server = serve_feeds(feeds)
+        original_feeds = feed_poller.RSS_FEEDS
+        feed_poller.RSS_FEEDS = [f"http://127.0.0.1:{server.server_port}{path}" for path in feeds]
+        try:
+            results["fetch"] = measure(list(range(repeat)), lambda _: service.fetch_from_feeds(), items_per_op=n)
+        finally:
+            feed_poller.RSS_FEEDS = original_feeds
+            server.shutdown()
+
+    if "clean" in stages:
+        import feedparser
+        feed = feedparser.parse(make_feed_xml(corpus))
+        source = feed.feed.get("title", "Unknown Source")
+        results["clean"] = measure(feed.entries, lambda entry: service.clean_entry(entry, source))
+
+    if "dedup" in stages or "add_to_chroma" in stages:
+        from app.agents.deduplication import DeduplicationAgent
+        dedup_agent = DeduplicationAgent()
+        # Seed half the corpus so lookups run against a populated index
+        seed, probe = articles[: n // 2], articles[n // 2:]
+        if "add_to_chroma" in stages:
+            results["add_to_chroma"] = measure(seed, dedup_agent.add_to_chroma)
+        else:
+            dedup_agent.add_batch_to_chroma(seed, dedup_agent.process_batch(seed))
+        if "dedup" in stages:
+            results["dedup"] = measure([a.model_copy() for a in probe], dedup_agent.process)
+
+    if "extraction" in stages:
+        from app.agents.extraction import ExtractionAgent
+        unlimited = TokenBucketRateLimiter(requests_per_second=1e9, tokens_per_minute=1e12)
+        extraction_agent = ExtractionAgent(llm=StubChatModel(), rate_limiter=unlimited, cache=None)
+        results["extraction"] = measure([a.model_copy() for a in articles], extraction_agent.process)
+
+    if "sqlite_save" in stages:
+        rows = [a.model_dump() for a in articles]
+        results["sqlite_save"] = measure(rows, save_article_to_sqlite)
+
+    if "query" in stages:
+        from app.agents.query import QueryAgent
+        if "sqlite_save" not in stages:
+            for a in articles:
+                save_article_to_sqlite(a.model_dump())
+        query_agent = QueryAgent(llm=StubChatModel())
+        queries = ["HDFC Bank news", "RBI policy", "Infosys results", "Tata Motors order", "SEBI penalty"]
+        workload = [queries[i % len(queries)] for i in range(max(repeat * len(queries), 10))]
+        results["query"] = measure(workload, query_agent.search)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "n": n,
+            "repeat": repeat,
+            "embedder": embedder_name,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+        },
+        "stages": results,
+    }
+
+def compare(current: Dict, baseline: Dict) -> List[Dict]:
+    """Per-stage ratios against a baseline; ratio > 1 means slower / lower throughput."""
+    rows = []
+    for stage, stats in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base:
+            continue
+        p50_ratio = stats["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        throughput_ratio = base["throughput_per_s"] / stats["throughput_per_s"] if stats["throughput_per_s"] else float("inf")
+        rows.append({
+            "stage": stage,
+            "p50_ratio": p50_ratio,
+            "throughput_ratio": throughput_ratio,
+            "regressed": p50_ratio > 1 + REGRESSION_TOLERANCE or throughput_ratio > 1 + REGRESSION_TOLERANCE,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline per-stage benchmarks")
+    parser.add_argument("--n", type=int, default=200, help="synthetic articles in the corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions for fetch/query stages")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {STAGES}")
+    parser.add_argument("--embedder", choices=["auto", "fake", "hashing", "sentence-transformers", "onnx", "int8"], default="auto")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against a saved results JSON")
+    parser.add_argument("--save-baseline", help="also write results to this path as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {sorted(unknown)}")
+
+    # Resolve output paths before run() changes the working directory
+    out = os.path.abspath(args.out) if args.out else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    save_baseline = os.path.abspath(args.save_baseline) if args.save_baseline else None
+
+    report = run(args.n, stages, args.embedder, args.repeat)
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as f:
+            report["comparison"] = compare(report, json.load(f))
+        regressions = [row for row in report["comparison"] if row["regressed"]]
+
+    payload = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    if save_baseline:
+        with open(save_baseline, "w") as f:
+            f.write(payload)
+
+    for row in regressions:
+        print(f"REGRESSION {row['stage']}: p50 x{row['p50_ratio']:.2f}, throughput x{1 / row['throughput_ratio']:.2f}", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
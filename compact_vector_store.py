@@ -0,0 +1,7 @@
+from app.core.database import init_db, compact_collection
+
+if __name__ == "__main__":
+    # Rebuilds chroma_db_v2 without stored documents and with the current HNSW settings.
+    # Stop the API and ingestion first.
+    init_db()
+    compact_collection()
@@ -18,13 +18,22 @@ def run_demo():
     try:
         response = requests.post(f"{BASE_URL}/ingest")
         if response.status_code == 200:
-            print(f"  - {response.json()['message']}")
+            job_id = response.json()['id']
+            print(f"  - {response.json()['message']} (job {job_id})")
         else:
             print(f"  - Error: {response.text}")
+            return
     except Exception as e:
         print(f"  - Failed to connect to API. Is it running? Error: {e}")
         return
-    time.sleep(2) # Wait for processing
+
+    # Wait for the background job to finish
+    while True:
+        job = requests.get(f"{BASE_URL}/jobs/{job_id}").json()
+        if job['status'] in ("completed", "failed"):
+            break
+        time.sleep(2)
+    print(f"  - Job {job['status']}: fetched {job['fetched']}, processed {job['processed']}, duplicates {job['duplicates']}")
         
     # 2. Check Stats
     print("\nStep 2: Checking System Stats...")
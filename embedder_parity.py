@@ -0,0 +1,30 @@
+import argparse
+import json
+from app.core.database import init_sqlite, get_sqlite_conn
+from app.core.embedders import BACKENDS, create_embedder, parity_report
+from app.agents.deduplication import DUPLICATE_THRESHOLD
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare duplicate decisions between two embedding backends")
+    parser.add_argument("--reference", default="sentence-transformers", choices=sorted(BACKENDS))
+    parser.add_argument("--candidate", default="onnx", choices=sorted(BACKENDS))
+    parser.add_argument("--limit", type=int, default=2000, help="most recent articles to compare on")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD)
+    args = parser.parse_args()
+
+    init_sqlite()
+    rows = get_sqlite_conn().execute(
+        "SELECT title, content FROM (SELECT title, content, published_at FROM articles ORDER BY published_at DESC LIMIT ?) ORDER BY published_at",
+        (args.limit,)
+    ).fetchall()
+    if not rows:
+        print("No articles in SQLite to compare on.")
+        return
+    texts = [f"{title} {content}" for title, content in rows]
+
+    print(f"Embedding {len(texts)} articles with {args.reference} and {args.candidate}...")
+    report = parity_report(texts, create_embedder(args.reference), create_embedder(args.candidate), args.threshold)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
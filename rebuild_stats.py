@@ -0,0 +1,22 @@
+import sys
+from app.core.database import init_sqlite, rebuild_stats
+
+def main():
+    check_only = "--check" in sys.argv
+    init_sqlite()
+
+    drift = rebuild_stats(check_only=check_only)
+    if not drift:
+        print("Stats are consistent with the articles table.")
+        return
+
+    print(f"Found drift in {len(drift)} counters:")
+    for key, values in sorted(drift.items()):
+        print(f"  {key}: stored={values['stored']} actual={values['actual']}")
+    if check_only:
+        print("Run without --check to rebuild.")
+    else:
+        print("Stats rebuilt.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import argparse
+from app.core.database import init_sqlite
+from app.core.embedders import BACKENDS, EMBEDDING_BACKEND
+from app.core.reindex import REINDEX_CHUNK_SIZE, load_checkpoint, reindex
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the Chroma vector store from SQLite into a fresh collection")
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--workers", type=int, default=1, help="embedding processes (0 = embed in this process)")
+    parser.add_argument("--chunk-size", type=int, default=REINDEX_CHUNK_SIZE)
+    parser.add_argument("--target", help="name of the new collection (default: articles-<timestamp>)")
+    parser.add_argument("--restart", action="store_true", help="discard an interrupted run instead of resuming it")
+    parser.add_argument("--no-switch", action="store_true", help="build the collection but keep the current one active")
+    parser.add_argument("--drop-old", action="store_true", help="delete the previous collection after switching")
+    parser.add_argument("--status", action="store_true", help="show the checkpoint of an interrupted run and exit")
+    args = parser.parse_args()
+
+    init_sqlite()
+    if args.status:
+        checkpoint = load_checkpoint()
+        print(checkpoint or "No re-index in progress.")
+        return
+
+    summary = reindex(
+        backend=args.backend,
+        model_name=args.model,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        target=args.target,
+        restart=args.restart,
+        switch=not args.no_switch,
+        drop_old=args.drop_old,
+    )
+    if summary['switched']:
+        # Processes embedding with another model keep using the previous collection (see current_collection_name)
+        print(f"Processes started with a different EMBEDDING_BACKEND keep using {summary['previous']}; "
+              f"restart them with EMBEDDING_BACKEND={args.backend} to use {summary['target']}.")
+
+if __name__ == "__main__":
+    main()
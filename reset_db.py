@@ -6,16 +6,17 @@ from app.core.database import init_db
 def reset():
     print("Resetting databases...")
     
-    # Remove SQLite
-    if os.path.exists("articles.db"):
-        os.remove("articles.db")
-        print("Removed articles.db")
+    # Remove SQLite (plus WAL side files)
+    for path in ["articles.db", "articles.db-wal", "articles.db-shm"]:
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"Removed {path}")
         
     # Remove ChromaDB
     if os.path.exists("chroma_db_v2"):
         shutil.rmtree("chroma_db_v2")
         print("Removed chroma_db_v2")
-        
+
     # Initialize
     print("Initializing new databases...")
     try:
@@ -0,0 +1,43 @@
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_mistralai import ChatMistralAI
+from app.agents import extraction
+from app.agents.extraction import ExtractionAgent
+from app.core.rate_limit import TokenBucketRateLimiter
+from app.models.article import Article
+from benchmarks.fakes import StubMistralServer
+
+def make_articles(n: int, round_: int):
+    return [
+        Article(id=f"r{round_}-{i}", title=f"HDFC Bank results {round_}-{i}", content="HDFC Bank beat estimates.", source="stub", published_at=datetime.now(), url=f"http://stub/{round_}/{i}")
+        for i in range(n)
+    ]
+
+def make_agent(server: StubMistralServer, monkeypatch) -> ExtractionAgent:
+    monkeypatch.setattr(extraction, "EXTRACTION_CACHE_ENABLED", False)
+    monkeypatch.setattr(extraction, "RATE_LIMIT_BASE_DELAY", 0.01)
+    llm = ChatMistralAI(endpoint=server.endpoint, api_key="stub", model=extraction.EXTRACTION_MODEL, temperature=0, max_retries=0)
+    return ExtractionAgent(llm=llm, rate_limiter=TokenBucketRateLimiter(1000, 10_000_000), concurrency=3)
+
+def test_process_batch_reuses_the_async_client_across_calls(monkeypatch):
+    # The LLM's async HTTP client binds to the event loop of its first call,
+    # so every process_batch call has to run on that same loop
+    with StubMistralServer(latency=0.05) as server:
+        agent = make_agent(server, monkeypatch)
+        for round_ in range(3):
+            articles = agent.process_batch(make_articles(3, round_))
+            assert [a.sector for a in articles] == ["Banking"] * 3
+            assert all(len(a.entities) == 2 for a in articles)
+
+def test_process_batch_retries_rate_limited_calls(monkeypatch):
+    with StubMistralServer(rate_limit_every=2) as server:
+        agent = make_agent(server, monkeypatch)
+        for round_ in range(2):
+            articles = agent.process_batch(make_articles(4, round_))
+            assert all(a.sector == "Banking" for a in articles)
+            assert all(not a.extraction_failed for a in articles)
+        assert server.requests > 8